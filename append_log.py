@@ -0,0 +1,194 @@
+"""
+Append-only JSON-lines log with batched fsync and atomic compaction
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from file_storage import FileLock
+
+
+class AppendLog:
+    """A JSON-lines file that is only ever appended to or atomically replaced.
+
+    Every append is written and flushed to the OS straight away, so it
+    survives a crash of the process; the fsync that makes it survive a
+    crash of the machine is batched, at most fsync_batch records or
+    fsync_interval seconds behind. A torn last line left by a crash is
+    skipped on read and dropped by the next compaction.
+
+    Several processes may share one log: appends and compactions hold an
+    advisory lock, and read_changes() picks up what other processes appended
+    by reading from the last offset it saw (a single stat when nothing
+    changed), or re-reads the whole file once it has been compacted.
+    """
+
+    def __init__(self, path: str, fsync_interval: float = 1.0, fsync_batch: int = 32):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self.lock = FileLock(f"{path}.lock")
+        self.invalid_lines = 0
+        # Bytes after the last newline: a line being written, or torn by a crash
+        self.partial_bytes = 0
+        self._file = None
+        self._thread_lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer: Optional[threading.Timer] = None
+        # Identity of the file read so far and how many bytes of it were consumed
+        self._read_inode: Optional[int] = None
+        self._read_offset = 0
+        atexit.register(self.close)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """Every well-formed record in the log, in append order"""
+        self._read_inode = None
+        self._read_offset = 0
+        self.invalid_lines = 0
+        _, records = self.read_changes()
+        return records
+
+    def read_changes(self) -> Tuple[bool, List[Dict[str, Any]]]:
+        """Records appended since the last read.
+
+        Returns (replaced, records): when the file was compacted or removed
+        since the last read, replaced is True and records is the whole log.
+        Only complete lines are consumed; a line still being written is
+        picked up by a later call.
+        """
+        try:
+            stat = os.stat(self.path)
+            if stat.st_ino == self._read_inode and stat.st_size == self._read_offset:
+                return False, []
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            replaced = self._read_inode is not None
+            self._read_inode = None
+            self._read_offset = 0
+            self.partial_bytes = 0
+            return replaced, []
+
+        with f:
+            stat = os.fstat(f.fileno())
+            replaced = stat.st_ino != self._read_inode or stat.st_size < self._read_offset
+            if replaced:
+                self._read_inode = stat.st_ino
+                self._read_offset = 0
+                self.invalid_lines = 0
+            elif stat.st_size == self._read_offset:
+                return False, []
+
+            f.seek(self._read_offset)
+            data = f.read(stat.st_size - self._read_offset)
+
+        complete = data[:data.rfind(b'\n') + 1]
+        self._read_offset += len(complete)
+        self.partial_bytes = len(data) - len(complete)
+        records = []
+        invalid_lines = 0
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                invalid_lines += 1
+        if invalid_lines:
+            self.invalid_lines += invalid_lines
+            logging.warning(f"Skipped {invalid_lines} malformed lines in {self.path}")
+        return replaced, records
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append one record, flushing it to the OS before returning"""
+        line = (json.dumps(record, default=str) + '\n').encode('utf-8')
+        with self.lock, self._thread_lock:
+            self._ensure_current_file()
+            # Never glue a record onto the torn tail of a crashed writer
+            if self._file.tell() > 0 and not self._ends_with_newline():
+                line = b'\n' + line
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_batch
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync_locked()
+            elif self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.fsync_interval, self.sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def _ensure_current_file(self) -> None:
+        """(Re)open the append handle if another process replaced the file"""
+        if self._file is not None:
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self._file.fileno()).st_ino:
+                self._sync_locked()
+                self._file.close()
+                self._file = None
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.seek(0, os.SEEK_END)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _sync_locked(self) -> None:
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+
+    def sync(self) -> None:
+        """fsync any appended records that are not yet durable"""
+        with self._thread_lock:
+            self._sync_locked()
+
+    def compact(self, records: List[Dict[str, Any]]) -> None:
+        """Atomically replace the log with records, e.g. to drop torn lines.
+
+        Callers sharing the log with other processes must hold self.lock and
+        have caught up with read_changes(), or concurrent appends are lost.
+        """
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with self.lock, self._thread_lock:
+            with open(temp_path, 'wb') as f:
+                for record in records:
+                    f.write((json.dumps(record, default=str) + '\n').encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                stat = os.fstat(f.fileno())
+            os.replace(temp_path, self.path)
+            # The records just written are already known to the caller
+            self._read_inode = stat.st_ino
+            self._read_offset = stat.st_size
+            self.invalid_lines = 0
+            self.partial_bytes = 0
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._unsynced = 0
+
+    def close(self) -> None:
+        """Sync and close the append handle"""
+        with self._thread_lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
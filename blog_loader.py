@@ -3,22 +3,78 @@ Blog data loader for Top Agents website
 Handles markdown files and converts them to blog posts with proper metadata
 """
 
+import bisect
+import hashlib
 import os
+import pickle
 import re
+import threading
 import frontmatter
+import markdown
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
 import logging
 from urllib.parse import quote
+from slug_index import SlugIndex
+from blog_search import BlogSearchIndex
+
+# Markdown extensions used to render post bodies
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'codehilite']
+
+# Related-post score: each shared tag counts more than a shared category
+RELATED_TAG_WEIGHT = 2
+RELATED_CATEGORY_WEIGHT = 1
+# Related posts kept per post; more than shown, as some may not be published yet
+RELATED_POSTS_PER_POST = 10
+
+# Bump whenever BlogPost or the index entries change shape
+BLOG_INDEX_FORMAT_VERSION = 2
+
+
+def split_post(raw: str) -> Tuple[Dict[str, Any], str]:
+    """Frontmatter metadata and markdown body of a post file's text"""
+    if raw.startswith('---'):
+        post = frontmatter.loads(raw)
+        return post.metadata, post.content
+    return {}, raw
+
+
+def file_stamp(file_path: str) -> Tuple[int, int]:
+    """(mtime_ns, size) of a file"""
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=int(os.environ.get('BLOG_BODY_CACHE_SIZE', 32)))
+def read_post_body(file_path: str, body_offset: int, body_length: int, stamp: Tuple[int, int]) -> str:
+    """Markdown body of a post, read from its file; recently used bodies stay cached.
+
+    The offsets are only valid for the file as it was indexed, so the open
+    file is checked against stamp first and a ValueError raised if it has
+    changed since; errors are never cached. A cache hit is not checked, so
+    callers compare the stamp before calling (see BlogPost.is_current).
+    """
+    with open(file_path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if (stat.st_mtime_ns, stat.st_size) != stamp:
+            raise ValueError(f"{file_path} changed since it was indexed")
+        f.seek(body_offset)
+        return f.read(body_length).decode('utf-8')
 
 
 @dataclass
 class BlogPost:
-    """Model class for representing a blog post"""
+    """Model class for representing a blog post.
+
+    The loader keeps only metadata in memory: content reads the markdown
+    body from file_path on demand (see read_post_body), unless the body was
+    passed in directly. If the file was edited after it was indexed, the
+    body is parsed from the current file instead.
+    """
     title: str
     slug: str
-    content: str
     excerpt: str
     author: str
     publish_date: datetime
@@ -27,6 +83,39 @@ class BlogPost:
     featured_image: Optional[str] = None
     meta_description: Optional[str] = None
     reading_time: Optional[int] = None
+    # sha256 of the markdown file, the key of its rendered HTML
+    content_hash: Optional[str] = None
+    # Where the body sits in the markdown file, in bytes
+    file_path: Optional[str] = None
+    body_offset: int = 0
+    body_length: int = 0
+    # (mtime_ns, size) of the markdown file the offsets and hash were taken from
+    file_stamp: Optional[Tuple[int, int]] = None
+    word_count: Optional[int] = None
+    body: Optional[str] = field(default=None, repr=False, compare=False)
+    
+    @property
+    def content(self) -> str:
+        """Markdown body of the post"""
+        if self.body is not None:
+            return self.body
+        # Checked before the body cache, which only knows the indexed file
+        if self.is_current():
+            try:
+                return read_post_body(self.file_path, self.body_offset, self.body_length, self.file_stamp)
+            except ValueError:
+                pass
+        with open(self.file_path, 'rb') as f:
+            return split_post(f.read().decode('utf-8'))[1]
+    
+    def is_current(self) -> bool:
+        """Whether the markdown file is unchanged since the post was indexed"""
+        if self.body is not None or self.file_path is None:
+            return True
+        try:
+            return file_stamp(self.file_path) == self.file_stamp
+        except OSError:
+            return False
     
     def __post_init__(self):
         """Process blog post data after initialization"""
@@ -36,10 +125,12 @@ class BlogPost:
             clean_content = re.sub(r'[#*`\[\]]', '', self.content)
             self.excerpt = clean_content[:200].strip() + '...' if len(clean_content) > 200 else clean_content
         
+        if self.word_count is None:
+            self.word_count = len(self.content.split())
+        
         # Calculate reading time if not provided
         if not self.reading_time:
-            word_count = len(self.content.split())
-            self.reading_time = max(1, word_count // 200)  # Average reading speed
+            self.reading_time = max(1, self.word_count // 200)  # Average reading speed
         
         # Generate meta description if not provided
         if not self.meta_description:
@@ -77,7 +168,7 @@ class BlogPost:
             "image": self.featured_image if self.featured_image else f"{base_url}/static/images/blog-default.jpg",
             "articleSection": self.category,
             "keywords": ", ".join(self.tags),
-            "wordCount": len(self.content.split()),
+            "wordCount": self.word_count,
             "timeRequired": f"PT{self.reading_time}M"
         }
 
@@ -104,9 +195,30 @@ class PaginatedPosts:
 class BlogLoader:
     """Class to handle loading and processing blog posts from markdown files"""
     
-    def __init__(self, blogs_dir: str = "blogs"):
+    def __init__(self, blogs_dir: str = "blogs", index_path: Optional[str] = None):
         self.blogs_dir = blogs_dir
+        # Metadata index of parsed posts; BLOG_INDEX_PATH='' disables it
+        if index_path is None:
+            index_path = os.environ.get('BLOG_INDEX_PATH', os.path.join(blogs_dir, '.blog_index.pkl'))
+        self.index_path = index_path
         self.posts = []
+        self.posts_by_slug = SlugIndex('blog post')
+        self.search_index = BlogSearchIndex([])
+        # Lowercased category / tag -> posts, newest first
+        self.posts_by_category: Dict[str, List[BlogPost]] = {}
+        self.posts_by_tag: Dict[str, List[BlogPost]] = {}
+        self.categories: List[str] = []
+        self.tags: List[str] = []
+        # Slug -> related posts, best first
+        self.related_posts: Dict[str, List[BlogPost]] = {}
+        # The posts (newest first) with their publish dates in ascending order, swapped in together
+        self._timeline: Tuple[List[BlogPost], List[datetime]] = ([], [])
+        # (timeline, valid until, published posts): reused until the next scheduled post goes live
+        self._published_cache: Optional[Tuple[Tuple, Optional[datetime], List[BlogPost]]] = None
+        # content hash -> rendered HTML; survives reloads for unchanged files
+        self.html_cache: Dict[str, str] = {}
+        self._html_lock = threading.Lock()
+        self._reload_lock = threading.RLock()
         self._load_posts()
     
     def _create_slug(self, title: str) -> str:
@@ -118,7 +230,7 @@ class BlogLoader:
         return slug.strip('-')
     
     def _load_posts(self):
-        """Load all blog posts from markdown files"""
+        """Load the metadata of all blog posts, parsing only files changed since the last index"""
         try:
             if not os.path.exists(self.blogs_dir):
                 logging.warning(f"Blogs directory not found: {self.blogs_dir}")
@@ -128,87 +240,243 @@ class BlogLoader:
             md_files = [f for f in os.listdir(self.blogs_dir) if f.endswith('.md')]
             logging.info(f"Found {len(md_files)} blog posts in {self.blogs_dir}")
             
+            previous_entries = self._read_index()
+            entries = {}
+            parsed = 0
+            # Built aside and swapped in whole, so a reload never exposes a partial list
+            posts = []
+            frequencies = []
             for filename in md_files:
                 try:
                     file_path = os.path.join(self.blogs_dir, filename)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Parse frontmatter if present
-                    if content.startswith('---'):
-                        post = frontmatter.loads(content)
-                        metadata = post.metadata
-                        content = post.content
-                    else:
-                        metadata = {}
-                    
-                    # Extract title from filename if not in metadata
-                    title = metadata.get('title', filename.replace('.md', '').replace('-', ' ').title())
-                    
-                    # Create slug
-                    slug = metadata.get('slug', self._create_slug(title))
-                    
-                    # Parse date
-                    date_str = metadata.get('date', metadata.get('publish_date', '2024-01-01'))
-                    if isinstance(date_str, str):
-                        try:
-                            publish_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                        except ValueError:
-                            publish_date = datetime(2024, 1, 1)
-                    else:
-                        publish_date = date_str
-                    
-                    # Create blog post
-                    blog_post = BlogPost(
-                        title=title,
-                        slug=slug,
-                        content=content,
-                        excerpt=metadata.get('excerpt', ''),
-                        author=metadata.get('author', 'Top Agents Team'),
-                        publish_date=publish_date,
-                        tags=metadata.get('tags', []),
-                        category=metadata.get('category', 'General'),
-                        featured_image=metadata.get('featured_image'),
-                        meta_description=metadata.get('meta_description'),
-                        reading_time=metadata.get('reading_time')
-                    )
-                    
-                    self.posts.append(blog_post)
+                    stamp = file_stamp(file_path)
+                    entry = previous_entries.get(filename)
+                    if entry is None or entry['stamp'] != stamp:
+                        entry = self._parse_post(filename, file_path, stamp)
+                        parsed += 1
+                    entries[filename] = entry
+                    posts.append(entry['post'])
+                    frequencies.append(entry['terms'])
                     
                 except Exception as e:
                     logging.error(f"Error processing blog file {filename}: {e}")
                     continue
             
+            if parsed or entries.keys() != previous_entries.keys():
+                self._write_index(entries)
+            
             # Sort posts by publish date (newest first)
-            self.posts.sort(key=lambda x: x.publish_date, reverse=True)
-            logging.info(f"Successfully loaded {len(self.posts)} blog posts")
+            order = sorted(range(len(posts)), key=lambda i: posts[i].publish_date, reverse=True)
+            posts = [posts[i] for i in order]
+            self.posts_by_slug = SlugIndex('blog post', posts)
+            self.search_index = BlogSearchIndex(posts, [frequencies[i] for i in order])
+            self._build_taxonomy(posts)
+            self._timeline = (posts, [post.publish_date for post in reversed(posts)])
+            self.posts = posts
+            logging.info(f"Successfully loaded {len(self.posts)} blog posts ({parsed} parsed, "
+                         f"{len(posts) - parsed} from the index)")
             
         except Exception as e:
             logging.error(f"Error loading blog posts: {e}")
     
+    def _parse_post(self, filename: str, file_path: str, stamp: Tuple[int, int]) -> Dict[str, Any]:
+        """Parse one markdown file into an index entry: its post, without the body, and search terms"""
+        with open(file_path, 'rb') as f:
+            raw = f.read().decode('utf-8')
+        content_hash = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+        metadata, content = split_post(raw)
+        
+        # Extract title from filename if not in metadata
+        title = metadata.get('title', filename.replace('.md', '').replace('-', ' ').title())
+        
+        # Create slug
+        slug = metadata.get('slug', self._create_slug(title))
+        
+        # Parse date
+        date_str = metadata.get('date', metadata.get('publish_date', '2024-01-01'))
+        if isinstance(date_str, str):
+            try:
+                publish_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+            except ValueError:
+                publish_date = datetime(2024, 1, 1)
+        else:
+            publish_date = date_str
+        
+        # Create blog post
+        blog_post = BlogPost(
+            title=title,
+            slug=slug,
+            body=content,
+            excerpt=metadata.get('excerpt', ''),
+            author=metadata.get('author', 'Top Agents Team'),
+            publish_date=publish_date,
+            tags=metadata.get('tags', []),
+            category=metadata.get('category', 'General'),
+            featured_image=metadata.get('featured_image'),
+            meta_description=metadata.get('meta_description'),
+            reading_time=metadata.get('reading_time'),
+            content_hash=content_hash,
+            file_path=file_path,
+            file_stamp=stamp
+        )
+        terms = BlogSearchIndex.weighted_frequencies(blog_post)
+        
+        # The body is the tail of the file; record where, and drop it from memory
+        position = raw.rfind(content)
+        if position >= 0:
+            blog_post.body_offset = len(raw[:position].encode('utf-8'))
+            blog_post.body_length = len(content.encode('utf-8'))
+            blog_post.body = None
+        return {'stamp': stamp, 'post': blog_post, 'terms': terms}
+    
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        """Index entries by file name, or nothing if the index is missing or outdated"""
+        if not self.index_path or not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, 'rb') as f:
+                index = pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable blog index {self.index_path}: {e}")
+            return {}
+        if index.get('format_version') != BLOG_INDEX_FORMAT_VERSION or index.get('blogs_dir') != self.blogs_dir:
+            return {}
+        return index['entries']
+    
+    def _write_index(self, entries: Dict[str, Dict[str, Any]]):
+        """Write the index atomically"""
+        if not self.index_path:
+            return
+        index = {'format_version': BLOG_INDEX_FORMAT_VERSION, 'blogs_dir': self.blogs_dir, 'entries': entries}
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                pickle.dump(index, f, protocol=5)
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            logging.error(f"Error saving blog index: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _build_taxonomy(self, posts: List[BlogPost]):
+        """Category and tag postings, sidebar lists and the related-posts graph"""
+        posts_by_category: Dict[str, List[BlogPost]] = {}
+        posts_by_tag: Dict[str, List[BlogPost]] = {}
+        for post in posts:
+            posts_by_category.setdefault(post.category.lower(), []).append(post)
+            for tag in dict.fromkeys(str(t).lower() for t in post.tags):
+                posts_by_tag.setdefault(tag, []).append(post)
+        
+        positions = {id(post): position for position, post in enumerate(posts)}
+        related_posts = {}
+        for post in posts:
+            scores: Dict[int, int] = {}
+            for tag in dict.fromkeys(str(t).lower() for t in post.tags):
+                for other in posts_by_tag[tag]:
+                    scores[positions[id(other)]] = scores.get(positions[id(other)], 0) + RELATED_TAG_WEIGHT
+            for other in posts_by_category[post.category.lower()]:
+                scores[positions[id(other)]] = scores.get(positions[id(other)], 0) + RELATED_CATEGORY_WEIGHT
+            # Best score first, newest first among equals
+            ranked = sorted(scores, key=lambda position: (-scores[position], position))
+            related = [posts[position] for position in ranked if posts[position].slug != post.slug]
+            related_posts.setdefault(post.slug, related[:RELATED_POSTS_PER_POST])
+        
+        self.posts_by_category = posts_by_category
+        self.posts_by_tag = posts_by_tag
+        self.categories = sorted({post.category for post in posts})
+        self.tags = sorted({tag for post in posts for tag in post.tags})
+        self.related_posts = related_posts
+    
+    def reload(self):
+        """Re-read the blogs directory, dropping rendered HTML of changed or removed posts"""
+        with self._reload_lock:
+            self._load_posts()
+            live_hashes = {post.content_hash for post in self.posts}
+            with self._html_lock:
+                self.html_cache = {h: html for h, html in self.html_cache.items() if h in live_hashes}
+    
+    def get_post_html(self, post: BlogPost) -> str:
+        """Rendered HTML of a post body, rendered on first access and cached by content hash"""
+        if not post.is_current():
+            # The hash is the old file's: render the current body without caching it
+            return markdown.markdown(post.content, extensions=MARKDOWN_EXTENSIONS)
+        html = self.html_cache.get(post.content_hash)
+        if html is None:
+            html = markdown.markdown(post.content, extensions=MARKDOWN_EXTENSIONS)
+            if post.content_hash is not None:
+                with self._html_lock:
+                    self.html_cache[post.content_hash] = html
+        return html
+    
+    def warm_html_cache(self) -> int:
+        """Render every post that is not cached yet; returns how many were rendered"""
+        rendered = 0
+        for post in self.posts:
+            if post.content_hash not in self.html_cache:
+                self.get_post_html(post)
+                rendered += 1
+        logging.info(f"Pre-rendered {rendered} blog posts")
+        return rendered
+    
     def get_all_posts(self) -> List[BlogPost]:
         """Get all blog posts"""
         return self.posts
     
     def get_published_posts(self) -> List[BlogPost]:
-        """Get only published blog posts (not future dated)"""
+        """Get only published blog posts (not future dated).
+
+        Posts are sorted newest first, so the published ones are a suffix of
+        the list; a bisect over the publish dates finds where it starts. The
+        result is reused until the next scheduled post's publish time.
+        """
         now = datetime.now()
-        return [post for post in self.posts if post.publish_date <= now]
+        timeline = self._timeline
+        cached = self._published_cache
+        if cached is not None and cached[0] is timeline and (cached[1] is None or now < cached[1]):
+            return cached[2]
+        
+        posts, dates_ascending = timeline
+        published_count = bisect.bisect_right(dates_ascending, now)
+        published = posts[len(posts) - published_count:]
+        next_publish = dates_ascending[published_count] if published_count < len(dates_ascending) else None
+        self._published_cache = (timeline, next_publish, published)
+        return published
     
     def get_post_by_slug(self, slug: str) -> Optional[BlogPost]:
-        """Get a specific blog post by its slug"""
-        for post in self.posts:
-            if post.slug == slug:
-                return post
-        return None
+        """Get a specific blog post by its slug, reloading first if its file was edited"""
+        post = self.posts_by_slug.get(slug)
+        if post is not None and not post.is_current():
+            with self._reload_lock:
+                # Another request may have reloaded while this one waited
+                post = self.posts_by_slug.get(slug)
+                if post is not None and not post.is_current():
+                    logging.info(f"Blog post {slug} changed on disk, reloading the blog index")
+                    self.reload()
+                    post = self.posts_by_slug.get(slug)
+        return post
+    
+    def search_posts(self, query: str, posts: Optional[List[BlogPost]] = None) -> List[BlogPost]:
+        """Posts matching query, best match first, optionally limited to posts"""
+        return self.search_index.search(query, posts)
     
     def get_posts_by_category(self, category: str) -> List[BlogPost]:
         """Get all posts in a specific category"""
-        return [post for post in self.posts if post.category.lower() == category.lower()]
+        return self.posts_by_category.get(category.lower(), [])
     
     def get_posts_by_tag(self, tag: str) -> List[BlogPost]:
         """Get all posts with a specific tag"""
-        return [post for post in self.posts if tag.lower() in [t.lower() for t in post.tags]]
+        return self.posts_by_tag.get(tag.lower(), [])
+    
+    def get_related_posts(self, post: BlogPost, limit: int = 3) -> List[BlogPost]:
+        """Published posts sharing the most tags (then the category) with post"""
+        now = datetime.now()
+        related = []
+        for other in self.related_posts.get(post.slug, []):
+            if other.publish_date <= now:
+                related.append(other)
+                if len(related) >= limit:
+                    break
+        return related
     
     def get_recent_posts(self, limit: int = 5) -> List[BlogPost]:
         """Get the most recent blog posts"""
@@ -221,17 +489,11 @@ class BlogLoader:
     
     def get_categories(self) -> List[str]:
         """Get all unique categories"""
-        categories = set()
-        for post in self.posts:
-            categories.add(post.category)
-        return sorted(list(categories))
+        return self.categories
     
     def get_tags(self) -> List[str]:
         """Get all unique tags"""
-        tags = set()
-        for post in self.posts:
-            tags.update(post.tags)
-        return sorted(list(tags))
+        return self.tags
     
     def get_paginated_posts(self, page, per_page):
         start = (page - 1) * per_page
@@ -242,4 +504,9 @@ class BlogLoader:
 
 
 # Global instance for use in routes
-blog_loader = BlogLoader() 
\ No newline at end of file
+blog_loader = BlogLoader()
+
+# Render every post at startup (before fork under preload) instead of on its first view
+if os.environ.get('BLOG_PRERENDER', '0') == '1':
+    blog_loader.warm_html_cache()
+ 
\ No newline at end of file
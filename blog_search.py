@@ -0,0 +1,129 @@
+"""
+BM25 full-text index over blog posts for the blog search box
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Term frequencies are weighted by the field a term occurs in (BM25F-style)
+FIELD_WEIGHTS = (
+    ('title', 3.0),
+    ('tags', 2.0),
+    ('category', 2.0),
+    ('excerpt', 1.5),
+    ('content', 1.0),
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Shorter query words only match whole terms; expanding "ai" or "to" into
+# every term containing them matches almost every post
+MIN_EXPAND_LENGTH = 3
+
+# Dropped from queries that have other words, and never expanded
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how',
+    'i', 'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'vs',
+    'was', 'what', 'when', 'where', 'which', 'who', 'why', 'will', 'with', 'you', 'your'
+})
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BlogSearchIndex:
+    """Inverted index of blog posts ranked with BM25.
+
+    Built once per load; a search touches only the vocabulary and the
+    postings of the terms a query word matches, never the post bodies.
+
+    Like the substring search it replaced, a query word matches any term it
+    occurs in ("gpt" finds "chatgpt", "agent" finds "agents"), but words are
+    matched separately and in any order, and tags and category are searched
+    too. Posts must match every query word. A word contained in a longer
+    term counts for the share of the term it covers, so exact matches rank
+    first. Stopwords and words shorter than MIN_EXPAND_LENGTH only match
+    whole terms, and stopwords are left out of queries with other words.
+    """
+
+    def __init__(self, posts: List[Any], frequencies: Optional[List[Counter]] = None):
+        self.posts = posts
+        self._doc_ids = {id(post): doc_id for doc_id, post in enumerate(posts)}
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self.doc_lengths: List[float] = []
+        for doc_id, post in enumerate(posts):
+            post_frequencies = frequencies[doc_id] if frequencies is not None else self.weighted_frequencies(post)
+            self.doc_lengths.append(sum(post_frequencies.values()))
+            for term, frequency in post_frequencies.items():
+                self.postings.setdefault(term, []).append((doc_id, frequency))
+        self.vocabulary = sorted(self.postings)
+        self.average_length = sum(self.doc_lengths) / len(posts) if posts else 0.0
+
+    @staticmethod
+    def weighted_frequencies(post: Any) -> Counter:
+        """Field-weighted term frequencies of a post; precompute them to index posts without their bodies"""
+        frequencies = Counter()
+        for field_name, weight in FIELD_WEIGHTS:
+            value = getattr(post, field_name) or ''
+            if isinstance(value, list):
+                value = ' '.join(str(v) for v in value)
+            for term in tokenize(str(value)):
+                frequencies[term] += weight
+        return frequencies
+
+    def _idf(self, term: str) -> float:
+        document_frequency = len(self.postings[term])
+        return math.log(1 + (len(self.posts) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _expand(self, word: str) -> List[Tuple[str, float]]:
+        """(term, weight) of every vocabulary term containing word; weight is the share of the term word covers"""
+        if len(word) < MIN_EXPAND_LENGTH or word in STOPWORDS:
+            return [(word, 1.0)] if word in self.postings else []
+        return [(term, len(word) / len(term)) for term in self.vocabulary if word in term]
+
+    def _word_scores(self, word: str) -> Dict[int, float]:
+        """BM25 contribution of one query word to every post containing it, via its best matching term"""
+        scores: Dict[int, float] = {}
+        for term, weight in self._expand(word):
+            idf = self._idf(term)
+            for doc_id, frequency in self.postings[term]:
+                length_norm = 1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / self.average_length
+                score = weight * idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, query: str, candidates: Optional[Iterable[Any]] = None) -> List[Any]:
+        """Posts matching every word of query, best first.
+
+        candidates restricts the result to those posts (e.g. the published
+        posts of one category). Ties keep the index order, newest first.
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words or not self.posts:
+            return []
+        words = [word for word in words if word not in STOPWORDS] or words
+
+        scores: Optional[Dict[int, float]] = None
+        # Rarest word first keeps the running intersection small
+        for word_scores in sorted((self._word_scores(word) for word in words), key=len):
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {doc_id: score + word_scores[doc_id]
+                          for doc_id, score in scores.items() if doc_id in word_scores}
+            if not scores:
+                return []
+
+        if candidates is not None:
+            allowed = {self._doc_ids.get(id(post)) for post in candidates}
+            scores = {doc_id: score for doc_id, score in scores.items() if doc_id in allowed}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self.posts[doc_id] for doc_id, _ in ranked]
@@ -0,0 +1,75 @@
+"""
+One loaded version of the agent catalog and the indexes derived from it
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from facet_index import FacetIndex
+from slug_index import SlugIndex
+
+
+FILTER_VALUE_KEYS = ('domains', 'use_cases', 'platforms', 'pricing', 'models', 'creators', 'raw_creators')
+
+
+class Catalog:
+    """Agents plus their search, facet and slug indexes and filter options.
+
+    DataLoader publishes a new Catalog on every reload by swapping a single
+    reference, so a request that read the reference once keeps a consistent
+    view while the next version is built. The agents and indexes of a
+    published catalog are never modified; approved agents go live through
+    extended(), which builds the next version without rereading the sources.
+    """
+
+    def __init__(self, agents: List[Any], search_index: Any = None,
+                 load_metrics: Optional[Dict[str, Any]] = None,
+                 source_stamp: Optional[Tuple] = None):
+        self.agents = agents
+        self.search_index = search_index
+        self.facet_index = FacetIndex(agents)
+        self.agents_by_slug = SlugIndex('agent', agents)
+        self.load_metrics = load_metrics or {}
+        # (mtime_ns, size) of each source file when the catalog was read
+        self.source_stamp = source_stamp
+        self.version = 0
+        # Built up front so it is ready before the catalog is published
+        self._filter_values = self._collect_filter_values(agents)
+
+    def extended(self, agents: List[Any], source_stamp: Optional[Tuple] = None) -> 'Catalog':
+        """New catalog with agents appended; this one is left as it was.
+
+        The search index is copied on write, as it is the costly one to
+        build; the facet and slug indexes are rebuilt.
+        """
+        search_index = self.search_index.extended(agents) if self.search_index is not None else None
+        return Catalog(self.agents + list(agents), search_index, self.load_metrics,
+                       source_stamp or self.source_stamp)
+
+    @staticmethod
+    def _agent_filter_values(agent: Any) -> Dict[str, List[str]]:
+        """Filter option values contributed by one agent"""
+        model = agent.underlying_model.strip()
+        creator = agent.creator.strip()
+        return {
+            'domains': agent.domain_list,
+            'use_cases': agent.use_case_list,
+            'platforms': agent.platform_list,
+            'pricing': [agent.pricing_clean],
+            'models': [model] if model else [],
+            'creators': [creator] if creator else [],
+            # api_categories lists creators verbatim
+            'raw_creators': [agent.creator]
+        }
+
+    @classmethod
+    def _collect_filter_values(cls, agents: List[Any]) -> Dict[str, List[str]]:
+        """Sorted unique filter values of a list of agents"""
+        collected: Dict[str, set] = {key: set() for key in FILTER_VALUE_KEYS}
+        for agent in agents:
+            for key, values in cls._agent_filter_values(agent).items():
+                collected[key].update(values)
+        return {key: sorted(values) for key, values in collected.items()}
+
+    def filter_values(self) -> Dict[str, List[str]]:
+        """Sorted unique filter values; shared, so callers must not modify them"""
+        return self._filter_values
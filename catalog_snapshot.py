@@ -0,0 +1,101 @@
+"""
+Versioned binary snapshot of the processed agent catalog
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+from typing import Any, Dict, List, Optional
+
+# Bump whenever Agent, SearchDocument or SearchIndex change shape
+SNAPSHOT_FORMAT_VERSION = 5
+
+
+def _file_hash(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_sources(paths: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """mtime, size and content hash of each source file (None if missing)"""
+    fingerprints = {}
+    for path in paths:
+        if not os.path.exists(path):
+            fingerprints[path] = None
+            continue
+        stat = os.stat(path)
+        fingerprints[path] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': _file_hash(path)
+        }
+    return fingerprints
+
+
+def _source_unchanged(path: str, recorded: Optional[Dict[str, Any]]) -> bool:
+    """Compare a source with its recorded fingerprint, hashing only if its mtime moved"""
+    if recorded is None or not os.path.exists(path):
+        return recorded is None and not os.path.exists(path)
+    stat = os.stat(path)
+    if stat.st_size != recorded['size']:
+        return False
+    if stat.st_mtime_ns == recorded['mtime_ns']:
+        return True
+    # Touched or re-checked-out files keep their snapshot if the bytes match
+    return _file_hash(path) == recorded['sha256']
+
+
+def load_snapshot(snapshot_path: str, source_paths: List[str]) -> Optional[Dict[str, Any]]:
+    """Return the snapshot payload if it matches the current sources, else None"""
+    if not snapshot_path or not os.path.exists(snapshot_path):
+        return None
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable catalog snapshot {snapshot_path}: {e}")
+        return None
+
+    if snapshot.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        logging.info("Catalog snapshot format changed, rebuilding")
+        return None
+    sources = snapshot.get('sources', {})
+    if sorted(sources) != sorted(source_paths):
+        return None
+    for path in source_paths:
+        if not _source_unchanged(path, sources[path]):
+            logging.info(f"Catalog source {path} changed, rebuilding snapshot")
+            return None
+    return snapshot['payload']
+
+
+def save_snapshot(snapshot_path: str, sources: Dict[str, Optional[Dict[str, Any]]],
+                  payload: Dict[str, Any]) -> bool:
+    """Write the payload atomically under the given source fingerprints.
+
+    The fingerprints should be taken before the sources are read, so a file
+    edited mid-build invalidates the snapshot instead of being masked by it.
+    """
+    if not snapshot_path:
+        return False
+    snapshot = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'sources': sources,
+        'payload': payload
+    }
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=5)
+        os.replace(temp_path, snapshot_path)
+        return True
+    except Exception as e:
+        logging.error(f"Error saving catalog snapshot: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
@@ -2,12 +2,26 @@ import pandas as pd
 import os
 import json
 from models import Agent
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 import logging
 from datetime import datetime, timedelta
 import time
-from intelligent_search import IntelligentSearch
+import threading
+from intelligent_search import IntelligentSearch, SearchIndex
 from rating_system import RatingSystem
+from query_cache import QueryCache
+from facet_index import FacetIndex
+from slug_index import SlugIndex
+from catalog import Catalog
+from catalog_snapshot import fingerprint_sources, load_snapshot, save_snapshot
+from file_storage import write_json_atomic
+from submission_queue import SubmissionQueue
+
+# CSV columns, in Agent field order
+AGENT_CSV_COLUMNS = (
+    'name', 'domains', 'use_cases', 'short_desc', 'long_desc', 'creator', 'url', 'platform',
+    'pricing', 'underlying_model', 'deployment', 'legitimacy', 'what_users_think'
+)
 
 class DataLoader:
     """Class to handle loading and processing agent data from CSV"""
@@ -15,53 +29,263 @@ class DataLoader:
     def __init__(self, csv_path: str = "combined_ai_agents_directory.csv"):
         self.csv_path = csv_path
         self.user_agents_path = "user_agents.json"
-        self.agents = []
+        # Processed catalog cache; set CATALOG_SNAPSHOT_PATH to '' to disable it
+        self.snapshot_path = os.environ.get('CATALOG_SNAPSHOT_PATH', 'catalog_snapshot.pkl')
         self.user_agents = []
         self.intelligent_search = IntelligentSearch()
         self.rating_system = RatingSystem()
+        self.submissions = SubmissionQueue(self.user_agents_path)
+        self.search_cache = QueryCache(
+            max_entries=int(os.environ.get('SEARCH_CACHE_SIZE', 512)),
+            ttl_seconds=float(os.environ.get('SEARCH_CACHE_TTL', 300))
+        )
+        # The live catalog; replaced as a whole by reload()
+        self.catalog = Catalog([])
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
         self._load_data()
     
+    @property
+    def agents(self) -> List[Agent]:
+        return self.catalog.agents
+    
+    @property
+    def facet_index(self) -> FacetIndex:
+        return self.catalog.facet_index
+    
+    @property
+    def agents_by_slug(self) -> SlugIndex:
+        return self.catalog.agents_by_slug
+    
+    @property
+    def catalog_version(self) -> int:
+        return self.catalog.version
+    
+    @property
+    def load_metrics(self) -> Dict[str, Any]:
+        return self.catalog.load_metrics
+    
     def _load_data(self):
-        """Load agent data from CSV file"""
+        """Load the agent catalog and publish it"""
+        catalog = self._build_catalog()
+        self._publish(catalog if catalog is not None else Catalog([], source_stamp=self._source_stamp()))
+    
+    def _build_catalog(self) -> Optional[Catalog]:
+        """Build a catalog from the snapshot, or from the CSV file if it is stale.
+
+        Nothing shared is touched, so this can run while requests are served
+        from the current catalog. Returns None if the CSV cannot be read.
+        """
+        # Stamp the sources before reading them so a concurrent edit is seen next time
+        source_stamp = self._source_stamp()
+        catalog = self._load_snapshot()
+        if catalog is None:
+            catalog = self._load_csv()
+        if catalog is not None:
+            catalog.source_stamp = source_stamp
+        return catalog
+    
+    def _load_csv(self) -> Optional[Catalog]:
+        """Build a catalog from the CSV file and approved user agents"""
         try:
             if not os.path.exists(self.csv_path):
                 logging.error(f"CSV file not found: {self.csv_path}")
-                return
+                return None
             
-            df = pd.read_csv(self.csv_path)
+            # Fingerprint the sources before reading them, see save_snapshot
+            sources = fingerprint_sources(self._source_paths()) if self.snapshot_path else {}
+            started = time.perf_counter()
+            df = self._read_agent_csv()
+            read_seconds = time.perf_counter() - started
             logging.info(f"Loaded {len(df)} agents from CSV")
             
-            # Convert DataFrame rows to Agent objects
-            for _, row in df.iterrows():
+            # Build Agent objects straight from the column lists
+            agents = []
+            skipped_rows = 0
+            columns = [df[column].tolist() for column in AGENT_CSV_COLUMNS]
+            for values in zip(*columns):
                 try:
-                    agent = Agent(
-                        name=str(row.get('name', '')),
-                        domains=str(row.get('domains', '')),
-                        use_cases=str(row.get('use_cases', '')),
-                        short_desc=str(row.get('short_desc', '')),
-                        long_desc=str(row.get('long_desc', '')),
-                        creator=str(row.get('creator', '')), 
-                        url=str(row.get('url', '')),
-                        platform=str(row.get('platform', '')),
-                        pricing=str(row.get('pricing', '')),
-                        underlying_model=str(row.get('underlying_model', '')),
-                        deployment=str(row.get('deployment', '')),
-                        legitimacy=str(row.get('legitimacy', '')),
-                        what_users_think=str(row.get('what_users_think', ''))
-                    )
-                    self.agents.append(agent)
+                    agents.append(Agent(*values))
                 except Exception as e:
                     logging.error(f"Error creating agent from row: {e}")
+                    skipped_rows += 1
                     continue
+            build_seconds = time.perf_counter() - started - read_seconds
             
             # Load user-submitted agents
-            self._load_user_agents()
+            agents.extend(self._load_user_agents())
+            
+            # Build the search, facet and slug indexes once for the loaded catalog
+            catalog = Catalog(agents, SearchIndex(self.intelligent_search, agents))
+            
+            total_seconds = time.perf_counter() - started
+            catalog.load_metrics = {
+                'source': 'csv',
+                'csv_rows': len(df),
+                'skipped_rows': skipped_rows,
+                'agents': len(agents),
+                'read_seconds': round(read_seconds, 4),
+                'build_seconds': round(build_seconds, 4),
+                'index_seconds': round(total_seconds - read_seconds - build_seconds, 4),
+                'total_seconds': round(total_seconds, 4)
+            }
+            logging.info(f"Catalog load metrics: {catalog.load_metrics}")
+            
+            if self.snapshot_path:
+                save_snapshot(self.snapshot_path, sources, {
+                    'agents': agents,
+                    'search_index': catalog.search_index,
+                    'load_metrics': catalog.load_metrics
+                })
+            return catalog
                     
         except Exception as e:
             logging.error(f"Error loading CSV data: {e}")
+            return None
+    
+    def _source_paths(self) -> List[str]:
+        """Files the catalog is built from"""
+        return [self.csv_path, self.user_agents_path]
+    
+    def _source_stamp(self) -> Tuple:
+        """(mtime_ns, size) of each source file, None for missing ones"""
+        stamp = []
+        for path in self._source_paths():
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    def _load_snapshot(self) -> Optional[Catalog]:
+        """Restore agents and the search index from an up-to-date snapshot"""
+        if not self.snapshot_path:
+            return None
+        
+        started = time.perf_counter()
+        payload = load_snapshot(self.snapshot_path, self._source_paths())
+        if payload is None:
+            return None
+        
+        agents = payload['agents']
+        catalog = Catalog(agents, payload['search_index'], {
+            'source': 'snapshot',
+            'agents': len(agents),
+            'total_seconds': round(time.perf_counter() - started, 4),
+            'built_from_csv': payload['load_metrics']
+        })
+        catalog.search_index.searcher = self.intelligent_search
+        logging.info(f"Loaded {len(agents)} agents from catalog snapshot {self.snapshot_path}")
+        return catalog
     
-    def _load_user_agents(self):
+    def _read_agent_csv(self) -> pd.DataFrame:
+        """Read the agent CSV as text columns, with missing cells as empty strings"""
+        # keep_default_na=False leaves empty cells as '' instead of NaN, so no
+        # field ends up as the literal string 'nan'
+        df = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False)
+        for column in AGENT_CSV_COLUMNS:
+            if column not in df.columns:
+                df[column] = ''
+        return df
+    
+    def _publish(self, catalog: Catalog):
+        """Make catalog the live one with a single reference swap"""
+        catalog.version = self.catalog.version + 1
+        self.catalog = catalog
+        if catalog.search_index is not None:
+            self.intelligent_search.attach_index(catalog.search_index)
+        # Keys carry the catalog version, so this only frees memory
+        self.search_cache.invalidate()
+    
+    def reload(self) -> bool:
+        """Re-read the CSV and approved user agents into a new catalog and swap it in.
+
+        Requests keep being served from the current catalog until the new one
+        is complete; if it cannot be built the current one stays live.
+        """
+        with self._reload_lock:
+            catalog = self._build_catalog()
+            if catalog is None:
+                logging.error("Catalog reload failed, keeping the current catalog")
+                return False
+            self._publish(catalog)
+            logging.info(f"Reloaded agent catalog, version {catalog.version}")
+            return True
+    
+    def sources_changed(self) -> bool:
+        """Whether a source file changed since the live catalog was read"""
+        return self._source_stamp() != self.catalog.source_stamp
+    
+    def start_auto_reload(self, interval: float):
+        """Poll the source files every interval seconds and reload when they change.
+
+        A change is only picked up once the files have stayed unchanged for a
+        full interval, so a CSV that is still being written is not loaded.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_watching.clear()
+        
+        def watch():
+            pending = None
+            while not self._stop_watching.wait(interval):
+                try:
+                    if not self.sources_changed():
+                        pending = None
+                        continue
+                    stamp = self._source_stamp()
+                    if stamp == pending:
+                        self.refresh_from_sources()
+                        pending = None
+                    else:
+                        pending = stamp
+                except Exception as e:
+                    logging.error(f"Error watching catalog sources: {e}")
+        
+        self._watcher = threading.Thread(target=watch, name='catalog-reloader', daemon=True)
+        self._watcher.start()
+    
+    def refresh_from_sources(self) -> bool:
+        """Bring the live catalog up to date with its changed source files.
+
+        When only user_agents.json changed and every user agent already live
+        is still approved, the newly approved ones are published in an
+        extended catalog, as review_user_agent() does; anything else takes a
+        full reload.
+        """
+        with self._reload_lock:
+            stamp = self._source_stamp()
+            live_stamp = self.catalog.source_stamp
+            if live_stamp is not None and stamp[0] == live_stamp[0]:
+                approved = self._load_user_agents()
+                live = {agent.slug for agent in self.agents if agent.legitimacy == 'User Submitted'}
+                if live <= {agent.slug for agent in approved}:
+                    added = [agent for agent in approved if agent.slug not in live]
+                    if added:
+                        self._publish(self.catalog.extended(added, stamp))
+                    else:
+                        self.catalog.source_stamp = stamp
+                    logging.info(f"Added {len(added)} approved user agents to the live catalog")
+                    return True
+        return self.reload()
+    
+    def stop_auto_reload(self):
+        """Stop the background source watcher"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+    
+    def add_agent(self, agent: Agent):
+        """Publish a catalog with an approved agent added to the live one"""
+        with self._reload_lock:
+            self._publish(self.catalog.extended([agent]))
+    
+    def _load_user_agents(self) -> List[Agent]:
         """Load approved user-submitted agents from JSON file"""
+        agents = []
         try:
             if os.path.exists(self.user_agents_path):
                 with open(self.user_agents_path, 'r') as f:
@@ -71,40 +295,43 @@ class DataLoader:
                 for agent_data in user_agents_data:
                     # Only load approved agents into main display
                     if agent_data.get('status') == 'approved':
-                        agent = Agent(
-                            name=agent_data['name'],
-                            domains=agent_data.get('domains', ''),
-                            use_cases=agent_data.get('use_cases', ''),
-                            short_desc=agent_data['short_desc'],
-                            long_desc=agent_data.get('long_desc', ''),
-                            creator=agent_data.get('creator', 'User Submitted'),
-                            url=agent_data.get('url', ''),
-                            platform=agent_data.get('platform', 'Web'),
-                            pricing=agent_data.get('pricing', 'Unknown'),
-                            underlying_model=agent_data.get('underlying_model', ''),
-                            deployment=agent_data.get('deployment', ''),
-                            legitimacy=agent_data.get('legitimacy', 'User Submitted')
-                        )
-                        self.agents.append(agent)
+                        agent = self._agent_from_submission(agent_data)
+                        agents.append(agent)
                         approved_count += 1
                 
                 if approved_count > 0:
                     logging.info(f"Loaded {approved_count} approved user-submitted agents")
         except Exception as e:
             logging.error(f"Error loading user agents: {e}")
+        return agents
+    
+    @staticmethod
+    def _agent_from_submission(agent_data: Dict[str, Any]) -> Agent:
+        return Agent(
+            name=agent_data['name'],
+            domains=agent_data.get('domains', ''),
+            use_cases=agent_data.get('use_cases', ''),
+            short_desc=agent_data['short_desc'],
+            long_desc=agent_data.get('long_desc', ''),
+            creator=agent_data.get('creator', 'User Submitted'),
+            url=agent_data.get('url', ''),
+            platform=agent_data.get('platform', 'Web'),
+            pricing=agent_data.get('pricing', 'Unknown'),
+            underlying_model=agent_data.get('underlying_model', ''),
+            deployment=agent_data.get('deployment', ''),
+            legitimacy=agent_data.get('legitimacy', 'User Submitted')
+        )
     
     def add_user_agent(self, agent_data: Dict[str, str]) -> bool:
-        """Add a new user-submitted agent for review (not directly to main list)"""
+        """Add a new user-submitted agent for review (not directly to main list).
+
+        The submission is appended to the submission queue; the background
+        compactor folds queued submissions into the pending file in batches,
+        so user_agents.json and the live catalogs are left alone.
+        """
         try:
-            # Load existing submissions first
-            existing_submissions = []
-            if os.path.exists(self.user_agents_path):
-                with open(self.user_agents_path, 'r') as f:
-                    existing_submissions = json.load(f)
-            
             # Create submission record with pending status
             submission = {
-                'id': f"user_{int(time.time())}_{len(existing_submissions) + 1}",
                 'name': agent_data['name'],
                 'domains': agent_data.get('domains', ''),
                 'use_cases': agent_data.get('use_cases', ''),
@@ -121,13 +348,7 @@ class DataLoader:
                 'submitted_date': datetime.now().isoformat(),
                 'reviewed': False
             }
-            
-            # Add new submission
-            existing_submissions.append(submission)
-            
-            # Save updated submissions
-            with open(self.user_agents_path, 'w') as f:
-                json.dump(existing_submissions, f, indent=2)
+            self.submissions.submit(submission)
             
             logging.info(f"Added new user agent submission for review: {agent_data['name']}")
             return True
@@ -136,6 +357,34 @@ class DataLoader:
             logging.error(f"Error adding user agent submission: {e}")
             return False
     
+    def get_pending_submissions(self) -> List[Dict[str, Any]]:
+        """User agent submissions awaiting review"""
+        try:
+            return self.submissions.pending()
+        except Exception as e:
+            logging.error(f"Error reading user agent submissions: {e}")
+            return []
+    
+    def review_user_agent(self, submission_id: str, approve: bool) -> bool:
+        """Approve or reject a submission; an approved agent goes live without a reload.
+
+        The decision is flushed to user_agents.json straight away, so other
+        workers add the agent through their source watcher; this worker's
+        watcher finds it live already and only records the new stamp.
+        """
+        try:
+            submission = self.submissions.review(submission_id, 'approved' if approve else 'rejected')
+            if submission is None:
+                return False
+            self.submissions.flush()
+            if approve:
+                self.add_agent(self._agent_from_submission(submission))
+            logging.info(f"{'Approved' if approve else 'Rejected'} user agent submission {submission_id}")
+            return True
+        except Exception as e:
+            logging.error(f"Error reviewing user agent submission: {e}")
+            return False
+    
     def _save_user_agents(self):
         """Save user-submitted agents to JSON file"""
         try:
@@ -160,8 +409,8 @@ class DataLoader:
                     'legitimacy': agent.legitimacy
                 })
             
-            with open(self.user_agents_path, 'w') as f:
-                json.dump(agents_data, f, indent=2)
+            with self.submissions.store_lock:
+                write_json_atomic(self.user_agents_path, agents_data, indent=2)
                 
         except Exception as e:
             logging.error(f"Error saving user agents: {e}")
@@ -172,88 +421,101 @@ class DataLoader:
     
     def get_agent_by_slug(self, slug: str) -> Agent:
         """Get a specific agent by its slug"""
-        for agent in self.agents:
-            if agent.slug == slug:
-                return agent
+        agent = self.agents_by_slug.get(slug)
+        if agent is not None:
+            return agent
         raise ValueError(f"Agent with slug '{slug}' not found")
     
     def get_filter_options(self) -> Dict[str, Any]:
-        """Get all available filter options for the UI"""
-        if not self.agents:
+        """Get all available filter options for the UI.
+
+        The lists are cached for the catalog and shared between callers, so
+        they must not be modified.
+        """
+        catalog = self.catalog
+        if not catalog.agents:
             return {}
         
-        # Collect all unique values for filters
-        domains = set()
-        use_cases = set()
-        platforms = set()
-        pricing_options = set()
-        models = set()
-        creators = set()
-        
-        for agent in self.agents:
-            domains.update(agent.domain_list)
-            use_cases.update(agent.use_case_list)
-            platforms.update(agent.platform_list)
-            pricing_options.add(agent.pricing_clean)
-            if agent.underlying_model.strip():
-                models.add(agent.underlying_model.strip())
-            if agent.creator.strip():
-                creators.add(agent.creator.strip())
-        
+        values = catalog.filter_values()
         return {
-            'domains': sorted(list(domains)),
-            'use_cases': sorted(list(use_cases)),
-            'platforms': sorted(list(platforms)),
-            'pricing': sorted(list(pricing_options)),
-            'models': sorted(list(models)),
-            'creators': sorted(list(creators))
+            'domains': values['domains'],
+            'use_cases': values['use_cases'],
+            'platforms': values['platforms'],
+            'pricing': values['pricing'],
+            'models': values['models'],
+            'creators': values['creators']
         }
     
-    def search_agents(self, query: str = "", filters: Optional[Dict[str, Any]] = None) -> List[Agent]:
-        """Search and filter agents based on query and filters"""
+    def get_category_options(self) -> Dict[str, Any]:
+        """Get the domains, use cases, creators and pricing models listed by the categories API"""
+        values = self.catalog.filter_values()
+        return {
+            'domains': values['domains'],
+            'use_cases': values['use_cases'],
+            'creators': values['raw_creators'],
+            'pricing_models': values['pricing']
+        }
+    
+    def search_agents(self, query: str = "", filters: Optional[Dict[str, Any]] = None,
+                      limit: Optional[int] = None, offset: int = 0) -> List[Agent]:
+        """Search and filter agents based on query and filters.
+
+        With a limit only one page of results is returned; without filters the
+        limit is pushed down into the ranking so only the top results are scored.
+        """
+        return self._search(self.catalog, query, filters, limit, offset)
+    
+    def _search(self, catalog: Catalog, query: str, filters: Optional[Dict[str, Any]],
+                limit: Optional[int] = None, offset: int = 0) -> List[Agent]:
+        """search_agents against one catalog version"""
         if filters is None:
             filters = {}
         
-        results = self.agents.copy()
+        if not query and not any(filters.values()):
+            return catalog.agents[offset:offset + limit] if limit is not None else catalog.agents.copy()
         
-        # Apply intelligent search
-        if query:
-            results = self.intelligent_search.search(results, query)
+        cache_key = (catalog.version, QueryCache.make_key(query, filters), offset, limit)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
         
-        # Apply filters
-        if filters.get('domain'):
-            results = [
-                agent for agent in results
-                if filters['domain'] in agent.domain_list
-            ]
-        
-        if filters.get('use_case'):
-            results = [
-                agent for agent in results
-                if filters['use_case'] in agent.use_case_list
-            ]
-        
-        if filters.get('platform'):
-            results = [
-                agent for agent in results
-                if filters['platform'] in agent.platform_list
-            ]
-        
-
+        if limit is not None and any(filters.values()):
+            # Filters drop ranked agents, so rank everything before paging
+            results = self._search_uncached(catalog, query, filters)[offset:offset + limit]
+        else:
+            results = self._search_uncached(catalog, query, filters, limit, offset)
+        # Cache the agents themselves: duplicate slugs would resolve to the wrong agent
+        self.search_cache.put(cache_key, tuple(results))
+        return results
+    
+    def _search_uncached(self, catalog: Catalog, query: str, filters: Dict[str, Any],
+                         limit: Optional[int] = None, offset: int = 0) -> List[Agent]:
+        """Rank and filter the catalog without consulting the result cache"""
+        results = catalog.agents
         
-        if filters.get('model'):
-            results = [
-                agent for agent in results
-                if filters['model'].lower() in agent.underlying_model.lower()
-            ]
+        # Apply intelligent search
+        if query:
+            results = self.intelligent_search.search(results, query, limit=limit, offset=offset,
+                                                     index=catalog.search_index)
         
-        if filters.get('creator'):
-            results = [
-                agent for agent in results
-                if filters['creator'].lower() in agent.creator.lower()
-            ]
+        # Apply filters as one AND over the facet bitmaps
+        mask = catalog.facet_index.filter_mask(filters)
+        if mask is not None:
+            if query:
+                results = catalog.facet_index.select(results, mask)
+            else:
+                results = catalog.facet_index.agents_in(mask)
         
-        return results
+        # Never hand out the live catalog list itself
+        return results.copy() if results is catalog.agents else results
+    
+    def get_facet_counts(self, query: str = "", filters: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, int]]:
+        """Per-facet value counts among the agents matching a search"""
+        catalog = self.catalog
+        if not query and not any((filters or {}).values()):
+            return catalog.facet_index.counts()
+        results = self._search(catalog, query, filters)
+        return catalog.facet_index.counts(catalog.facet_index.mask_of(results))
     
     def get_last_updated_time(self) -> str:
         """Get a human-readable timestamp for when the directory was last updated"""
@@ -305,3 +567,13 @@ class DataLoader:
 
 # Global data loader instance
 data_loader = DataLoader()
+
+# Pick up catalog edits without restarting workers; 0 disables the watcher
+CATALOG_RELOAD_INTERVAL = float(os.environ.get('CATALOG_RELOAD_INTERVAL', 30))
+if CATALOG_RELOAD_INTERVAL > 0:
+    data_loader.start_auto_reload(CATALOG_RELOAD_INTERVAL)
+
+# Batch queued /add-agent submissions into user_agents.json; 0 leaves them queued until a review
+SUBMISSION_FLUSH_INTERVAL = float(os.environ.get('SUBMISSION_FLUSH_INTERVAL', 5))
+if SUBMISSION_FLUSH_INTERVAL > 0:
+    data_loader.submissions.start_compactor(SUBMISSION_FLUSH_INTERVAL)
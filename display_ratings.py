@@ -3,78 +3,77 @@
 Simple rating display system for templates
 """
 
-import json
-import random
-from typing import Dict, Tuple
+from typing import Dict, Any, Union
+
+from data_loader import data_loader
+from models import Agent, create_slug
+from rating_system import RatingSystem
+
+FULL_STAR = '<i class="text-yellow-400 text-sm">★</i>'
+HALF_STAR = '<i class="text-yellow-400 text-sm">☆</i>'
+EMPTY_STAR = '<i class="text-gray-300 text-sm">☆</i>'
+NO_RATING_STARS = '<i class="text-gray-300 text-sm">☆☆☆☆☆</i>'
+
+
+def _generate_stars_display(tenths: int) -> str:
+    """Generate HTML for star display of a rating given in tenths of a star"""
+    full_stars, remainder = divmod(tenths, 10)
+    half_star = remainder >= 5
+    empty_stars = 5 - full_stars - (1 if half_star else 0)
+    return ''.join([FULL_STAR * full_stars, HALF_STAR if half_star else '', EMPTY_STAR * empty_stars])
+
+
+# Displayed averages are rounded to one decimal, so 0.0-5.0 covers every star row
+STARS_BY_TENTHS = tuple(_generate_stars_display(tenths) for tenths in range(51))
+
 
 class DisplayRatings:
-    """Simple class to get rating display data for agents"""
-    
-    def __init__(self):
-        self.ratings_cache = {}
-        self._load_ratings()
-    
-    def _load_ratings(self):
-        """Load ratings from JSON file"""
-        try:
-            with open('ratings.json', 'r') as f:
-                ratings_data = json.load(f)
-            
-            # Process ratings by agent
-            agent_ratings = {}
-            for rating in ratings_data:
-                slug = rating['agent_slug']
-                if slug not in agent_ratings:
-                    agent_ratings[slug] = []
-                agent_ratings[slug].append(rating['rating'])
-            
-            # Calculate averages and counts
-            for slug, ratings in agent_ratings.items():
-                avg_rating = sum(ratings) / len(ratings)
-                self.ratings_cache[slug] = {
-                    'average_rating': round(avg_rating, 1),
-                    'review_count': len(ratings),
-                    'stars_display': self._generate_stars_display(avg_rating)
-                }
-                
-        except Exception as e:
-            print(f"Error loading ratings: {e}")
-    
-    def _generate_stars_display(self, rating: float) -> str:
-        """Generate HTML for star display"""
-        full_stars = int(rating)
-        half_star = rating - full_stars >= 0.5
-        empty_stars = 5 - full_stars - (1 if half_star else 0)
-        
-        stars_html = ""
-        
-        # Full stars
-        for _ in range(full_stars):
-            stars_html += '<i class="text-yellow-400 text-sm">★</i>'
-        
-        # Half star
-        if half_star:
-            stars_html += '<i class="text-yellow-400 text-sm">☆</i>'
-        
-        # Empty stars
-        for _ in range(empty_stars):
-            stars_html += '<i class="text-gray-300 text-sm">☆</i>'
-        
-        return stars_html
-    
-    def get_agent_rating_display(self, agent_name: str) -> Dict[str, any]:
-        """Get rating display data for an agent"""
-        slug = agent_name.lower().replace(' ', '-').replace('.', '').replace('(', '').replace(')', '')
-        
-        if slug in self.ratings_cache:
-            return self.ratings_cache[slug]
-        
-        # Return default if no rating found
+    """Rating display data for agent cards, read from the live rating aggregates.
+
+    Display entries are built once per agent and reused until the rating
+    system's version moves. Ratings other workers appended are picked up by
+    refresh(), which runs once per request rather than once per card.
+    """
+
+    def __init__(self, rating_system: RatingSystem):
+        self.rating_system = rating_system
+        self.ratings_cache: Dict[str, Dict[str, Any]] = {}
+        self._cache_version = None
+
+    def get_agent_rating_display(self, agent: Union[Agent, str]) -> Dict[str, Any]:
+        """Get rating display data for an agent, or for an agent name"""
+        slug = agent.slug if isinstance(agent, Agent) else create_slug(agent)
+
+        if self._cache_version != self.rating_system.version:
+            self.ratings_cache = {}
+            self._cache_version = self.rating_system.version
+
+        display = self.ratings_cache.get(slug)
+        if display is None:
+            display = self.ratings_cache[slug] = self._build_display(slug)
+        return display
+
+    def refresh(self):
+        """Catch up with ratings recorded by other workers"""
+        self.rating_system.refresh()
+
+    def _build_display(self, slug: str) -> Dict[str, Any]:
+        aggregate = self.rating_system.aggregates.get(slug)
+        if aggregate is None or not aggregate.count:
+            # Return default if no rating found
+            return {
+                'average_rating': 0.0,
+                'review_count': 0,
+                'stars_display': NO_RATING_STARS
+            }
+
+        average_rating = round(aggregate.average, 1)
+        tenths = min(max(round(average_rating * 10), 0), 50)
         return {
-            'average_rating': 0.0,
-            'review_count': 0,
-            'stars_display': '<i class="text-gray-300 text-sm">☆☆☆☆☆</i>'
+            'average_rating': average_rating,
+            'review_count': aggregate.count,
+            'stars_display': STARS_BY_TENTHS[tenths]
         }
 
-# Global instance for use in templates
-display_ratings = DisplayRatings()
\ No newline at end of file
+# Global instance for use in templates, sharing the ratings the write path updates
+display_ratings = DisplayRatings(data_loader.rating_system)
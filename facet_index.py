@@ -0,0 +1,181 @@
+"""
+Bitmap facet index for filtering the agent catalog
+"""
+
+from array import array
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+# Facet name -> values an agent contributes to it
+FACET_VALUES: Dict[str, Callable[[Any], Iterable[str]]] = {
+    'domain': lambda agent: agent.domain_list,
+    'use_case': lambda agent: agent.use_case_list,
+    'platform': lambda agent: agent.platform_list,
+    'pricing': lambda agent: [agent.pricing_clean],
+    'model': lambda agent: [agent.underlying_model],
+    'creator': lambda agent: [agent.creator],
+}
+
+# Facets filtered by case-insensitive substring rather than exact value
+SUBSTRING_FACETS = frozenset(['model', 'creator'])
+
+# A value keeps a bitmap once at least 1/DENSE_RATIO of the agents have it,
+# and a sorted array of agent ordinals below that
+DENSE_RATIO = 32
+
+# Set bit positions of every byte value, for walking a bitmap a byte at a time
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+Posting = Union[int, array]
+
+
+class FacetIndex:
+    """Maps every facet value to the ordinals of the agents that have it.
+
+    Ordinal i stands for the i-th agent added. Values shared by many agents
+    keep a bitmap with bit i set, so combining filters is a bitwise AND and
+    counting matches is int.bit_count(). Rare values, which is most creators
+    and models, keep a sorted array of ordinals instead, as a bitmap each
+    would cost a byte per eight agents for every one of them. Filters and
+    counts take and return bitmaps over all agents.
+    """
+
+    def __init__(self, agents: Optional[List[Any]] = None):
+        self.agents: List[Any] = []
+        self.postings: Dict[str, Dict[str, Posting]] = {facet: {} for facet in FACET_VALUES}
+        self._ordinals: Dict[int, int] = {}
+        for agent in agents or []:
+            self._append(agent)
+        # Bitmaps are built once from the complete arrays, not grown bit by bit
+        for postings in self.postings.values():
+            for value, posting in postings.items():
+                if self._is_dense(posting):
+                    postings[value] = self._bitmap(posting)
+
+    @property
+    def all_bits(self) -> int:
+        """Bitmap with every indexed agent set"""
+        return (1 << len(self.agents)) - 1
+
+    def _is_dense(self, posting: array) -> bool:
+        return len(posting) * DENSE_RATIO >= len(self.agents)
+
+    def _append(self, agent: Any) -> int:
+        ordinal = len(self.agents)
+        self.agents.append(agent)
+        self._ordinals[id(agent)] = ordinal
+        for facet, values_of in FACET_VALUES.items():
+            postings = self.postings[facet]
+            for value in values_of(agent):
+                posting = postings.get(value)
+                if posting is None:
+                    postings[value] = array('I', [ordinal])
+                elif isinstance(posting, int):
+                    postings[value] = posting | 1 << ordinal
+                elif posting[-1] != ordinal:
+                    posting.append(ordinal)
+        return ordinal
+
+    def add(self, agent: Any) -> None:
+        """Index one agent under each of its facet values"""
+        self._append(agent)
+        for facet, values_of in FACET_VALUES.items():
+            postings = self.postings[facet]
+            for value in values_of(agent):
+                posting = postings[value]
+                if not isinstance(posting, int) and self._is_dense(posting):
+                    postings[value] = self._bitmap(posting)
+
+    def _bitmap(self, ordinals: Iterable[int]) -> int:
+        """Bitmap with the given ordinals set"""
+        data = bytearray((len(self.agents) + 7) // 8)
+        for ordinal in ordinals:
+            data[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(data, 'little')
+
+    def _bytes(self, mask: int) -> bytes:
+        """mask as little-endian bytes, for testing single bits in O(1)"""
+        return mask.to_bytes((len(self.agents) + 7) // 8, 'little')
+
+    def ordinals_in(self, mask: int) -> Iterator[int]:
+        """Ordinals whose bits are set in mask, ascending"""
+        for index, byte in enumerate(self._bytes(mask)):
+            if byte:
+                base = index << 3
+                for bit in _BYTE_BITS[byte]:
+                    yield base + bit
+
+    def match(self, facet: str, value: str) -> int:
+        """Bitmap of agents matching one filter value"""
+        postings = self.postings[facet]
+        if facet not in SUBSTRING_FACETS:
+            matched = [postings[value]] if value in postings else []
+        else:
+            needle = value.lower()
+            matched = [posting for candidate, posting in postings.items() if needle in candidate.lower()]
+
+        bits = 0
+        for posting in matched:
+            if isinstance(posting, int):
+                bits |= posting
+        sparse = [posting for posting in matched if not isinstance(posting, int)]
+        if sparse:
+            bits |= self._bitmap(chain.from_iterable(sparse))
+        return bits
+
+    def filter_mask(self, filters: Dict[str, Any]) -> Optional[int]:
+        """AND of the bitmaps for every set filter, or None when nothing filters"""
+        mask = None
+        for facet in FACET_VALUES:
+            value = filters.get(facet)
+            if not value:
+                continue
+            bits = self.match(facet, value)
+            mask = bits if mask is None else mask & bits
+        return mask
+
+    def contains(self, mask: int, agent: Any) -> bool:
+        """Whether an indexed agent's bit is set in mask"""
+        ordinal = self._ordinals.get(id(agent))
+        return ordinal is not None and bool(mask >> ordinal & 1)
+
+    def select(self, agents: Iterable[Any], mask: int) -> List[Any]:
+        """The given agents whose bits are set in mask, in their given order"""
+        data = self._bytes(mask)
+        selected = []
+        for agent in agents:
+            ordinal = self._ordinals.get(id(agent))
+            if ordinal is not None and data[ordinal >> 3] >> (ordinal & 7) & 1:
+                selected.append(agent)
+        return selected
+
+    def mask_of(self, agents: Iterable[Any]) -> int:
+        """Bitmap of the given indexed agents"""
+        ordinals = (self._ordinals.get(id(agent)) for agent in agents)
+        return self._bitmap(ordinal for ordinal in ordinals if ordinal is not None)
+
+    def agents_in(self, mask: int) -> List[Any]:
+        """Agents whose bits are set in mask, in catalog order"""
+        return [self.agents[ordinal] for ordinal in self.ordinals_in(mask)]
+
+    def counts(self, mask: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """Per-facet value counts among the agents in mask (default: all)"""
+        # Rare values are counted over the agents in the mask, not per value
+        masked_agents = self.agents_in(mask) if mask is not None else None
+        facet_counts = {}
+        for facet, postings in self.postings.items():
+            values = {}
+            for value, posting in postings.items():
+                if isinstance(posting, int):
+                    values[value] = (posting & mask if mask is not None else posting).bit_count()
+                elif mask is None:
+                    values[value] = len(posting)
+            if masked_agents is not None:
+                values_of = FACET_VALUES[facet]
+                for agent in masked_agents:
+                    for value in set(values_of(agent)):
+                        if not isinstance(postings[value], int):
+                            values[value] = values.get(value, 0) + 1
+            facet_counts[facet] = dict(sorted((value, count) for value, count in values.items()
+                                              if count and value.strip()))
+        return facet_counts
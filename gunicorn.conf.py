@@ -0,0 +1,53 @@
+"""
+Gunicorn settings: load the catalog once in the master and share it copy-on-write with the workers
+"""
+
+import gc
+import os
+
+from process_memory import read_process_memory
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Set GUNICORN_PRELOAD=1 (or pass --preload) to import the app, and with it
+# the agent catalog, recipes, blog posts and ratings, once before forking.
+# Off by default: with --reload, as the dev workflow in .replit runs it, a
+# preloaded app is never re-imported, so code changes would not show up.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+
+
+def when_ready(server):
+    """Runs in the master once the preloaded app is imported, right before workers fork"""
+    if not server.cfg.preload_app:
+        return
+    if server.cfg.reload:
+        server.log.warning("Preloading the app: --reload will not pick up code changes")
+
+    from data_loader import data_loader
+    # Threads do not survive fork; each worker starts its own watcher and compactor
+    data_loader.stop_auto_reload()
+    data_loader.submissions.stop_compactor()
+
+    # Move every object allocated so far into a permanent generation. The
+    # workers' collector then never walks or links them, so it does not write
+    # to (and copy) the pages holding the shared catalog.
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Froze {gc.get_freeze_count()} preloaded objects; master memory {read_process_memory()}")
+
+
+def post_fork(server, worker):
+    """Restart per-worker background threads"""
+    if not server.cfg.preload_app:
+        return
+
+    from data_loader import data_loader, CATALOG_RELOAD_INTERVAL, SUBMISSION_FLUSH_INTERVAL
+    if CATALOG_RELOAD_INTERVAL > 0:
+        data_loader.start_auto_reload(CATALOG_RELOAD_INTERVAL)
+    if SUBMISSION_FLUSH_INTERVAL > 0:
+        data_loader.submissions.start_compactor(SUBMISSION_FLUSH_INTERVAL)
+
+
+def post_worker_init(worker):
+    """Log how much memory the new worker does not share with the master"""
+    worker.log.info(f"Worker {worker.pid} memory: {read_process_memory()}")
@@ -2,9 +2,33 @@
 Intelligent search functionality using fuzzy matching and semantic understanding
 """
 
-from fuzzywuzzy import fuzz, process
-from typing import List, Dict, Any, Tuple
-import re
+import copy
+import heapq
+from collections import Counter
+from fuzzywuzzy import fuzz, process, utils
+from typing import List, Dict, Any, Tuple, Optional, Set, Callable
+from models import SEARCH_TOKEN_PATTERN as TOKEN_PATTERN
+
+# Words ignored when extracting query keywords
+COMMON_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'can', 'may', 'might', 'must'})
+
+# Bound on memoized extract_intent results
+MAX_CACHED_INTENTS = 10000
+
+# WRatio score a keyword needs against a token to count as a fuzzy hit
+FUZZY_KEYWORD_CUTOFF = 75
+
+# Intent kinds in scoring order, with the score each matching value adds
+INTENT_WEIGHTS = (('categories', 1.5), ('use_cases', 1.2), ('platforms', 1.0))
+
+# Slack for float rounding when comparing score bounds
+SCORE_EPSILON = 1e-9
+
+# Most _fuzzy_field_score can give: name 3.0 + creator 1.5 + short_desc 2.0 + long_desc 1.0
+MAX_FUZZY_FIELD_SCORE = 7.5
+
+# Agent fields tokenized into the inverted index
+INDEXED_FIELDS = ('name', 'creator', 'short_desc', 'long_desc', 'domains', 'use_cases', 'platform')
 
 
 class IntelligentSearch:
@@ -66,140 +90,627 @@ class IntelligentSearch:
             'education': ['education', 'learning', 'teaching', 'training'],
             'entertainment': ['entertainment', 'fun', 'game', 'play']
         }
+        
+        # Inverted index over the loaded catalog, see build_index()
+        self.index: Optional[SearchIndex] = None
+        
+        # All intent keywords compiled into one automaton, plus per-query memo
+        self.intent_automaton = self._compile_intent_automaton()
+        self._intent_cache: Dict[str, Dict[str, List[str]]] = {}
+    
+    def _compile_intent_automaton(self) -> 'KeywordAutomaton':
+        """Compile the category, platform and use case keywords into one automaton"""
+        patterns: Dict[str, List[Tuple[str, str]]] = {}
+        for kind, keyword_map in (('categories', self.category_keywords),
+                                  ('platforms', self.platform_keywords),
+                                  ('use_cases', self.use_case_keywords)):
+            for label, keywords in keyword_map.items():
+                for keyword in keywords:
+                    patterns.setdefault(keyword, []).append((kind, label))
+        return KeywordAutomaton(patterns)
     
     def extract_intent(self, query: str) -> Dict[str, List[str]]:
         """Extract user intent from natural language query"""
         query_lower = query.lower().strip()
+        intent = self._intent_cache.get(query_lower)
+        if intent is None:
+            intent = self._extract_intent(query_lower)
+            if len(self._intent_cache) >= MAX_CACHED_INTENTS:
+                self._intent_cache.clear()
+            self._intent_cache[query_lower] = intent
+        # Hand out copies so callers cannot alter the memoized lists
+        return {kind: list(values) for kind, values in intent.items()}
+    
+    def _extract_intent(self, query_lower: str) -> Dict[str, List[str]]:
+        """Find every category, platform and use case in a single pass over the query"""
+        matched = self.intent_automaton.find(query_lower)
         intent = {
-            'categories': [],
-            'platforms': [],
-            'use_cases': [],
+            'categories': [c for c in self.category_keywords if ('categories', c) in matched],
+            'platforms': [p for p in self.platform_keywords if ('platforms', p) in matched],
+            'use_cases': [u for u in self.use_case_keywords if ('use_cases', u) in matched],
             'keywords': []
         }
         
-        # Extract categories
-        for category, keywords in self.category_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    intent['categories'].append(category)
-                    break
-        
-        # Extract platforms
-        for platform, keywords in self.platform_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    intent['platforms'].append(platform)
-                    break
-        
-        # Extract use cases
-        for use_case, keywords in self.use_case_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    intent['use_cases'].append(use_case)
-                    break
-        
         # Extract individual keywords (remove common words)
-        common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'can', 'may', 'might', 'must'}
-        words = re.findall(r'\b\w+\b', query_lower)
-        intent['keywords'] = [word for word in words if word not in common_words and len(word) > 2]
+        words = TOKEN_PATTERN.findall(query_lower)
+        intent['keywords'] = [word for word in words if word not in COMMON_WORDS and len(word) > 2]
         
         return intent
     
-    def calculate_relevance_score(self, agent: Any, query: str, intent: Dict[str, List[str]]) -> float:
-        """Calculate relevance score for an agent based on query and intent"""
+    def calculate_relevance_score(self, agent: Any, query: str, intent: Dict[str, List[str]],
+                                  fuzzy_terms: Optional[Dict[str, Set[str]]] = None,
+                                  intent_counts: Optional[List[Tuple[float, int]]] = None) -> float:
+        """Calculate relevance score for an agent based on query and intent.
+
+        fuzzy_terms maps each keyword to its close vocabulary terms (see
+        SearchIndex.resolve_keywords); without it every agent's tokens are
+        fuzzy-matched individually. intent_counts may carry precomputed
+        intent matches (see intent_match_counts).
+        """
+        query_lower = query.lower()
+        doc = agent.search_doc
+        if intent_counts is None:
+            intent_counts = self.intent_match_counts(agent, intent)
+        score = self._fuzzy_field_score(doc, query_lower)
+        return self._term_score(doc, query_lower, intent, intent_counts, fuzzy_terms, score)
+    
+    def _fuzzy_field_score(self, doc: Any, query_lower: str) -> float:
+        """Weighted partial_ratio of the query against the name, creator and descriptions"""
         score = 0.0
         
         # Direct name matching (highest weight)
-        name_score = fuzz.partial_ratio(query.lower(), agent.name.lower()) / 100.0
+        name_score = fuzz.partial_ratio(query_lower, doc.name) / 100.0
         score += name_score * 3.0
         
         # Creator matching
-        creator_score = fuzz.partial_ratio(query.lower(), agent.creator.lower()) / 100.0
+        creator_score = fuzz.partial_ratio(query_lower, doc.creator) / 100.0
         score += creator_score * 1.5
         
         # Description matching
-        desc_score = fuzz.partial_ratio(query.lower(), agent.short_desc.lower()) / 100.0
+        desc_score = fuzz.partial_ratio(query_lower, doc.short_desc) / 100.0
         score += desc_score * 2.0
         
         # Long description matching
-        long_desc_score = fuzz.partial_ratio(query.lower(), agent.long_desc.lower()) / 100.0
+        long_desc_score = fuzz.partial_ratio(query_lower, doc.long_desc) / 100.0
         score += long_desc_score * 1.0
         
-        # Category intent matching
-        agent_domains = agent.domains.lower().split(',')
-        for category in intent['categories']:
-            for domain in agent_domains:
-                if category in domain or fuzz.partial_ratio(category, domain) > 70:
-                    score += 1.5
-        
-        # Use case intent matching
-        agent_use_cases = agent.use_cases.lower().split(',')
-        for use_case in intent['use_cases']:
-            for agent_use_case in agent_use_cases:
-                if use_case in agent_use_case or fuzz.partial_ratio(use_case, agent_use_case) > 70:
-                    score += 1.2
-        
-        # Platform intent matching
-        for platform in intent['platforms']:
-            if platform in agent.platform.lower() or fuzz.partial_ratio(platform, agent.platform.lower()) > 70:
-                score += 1.0
+        return score
+    
+    def _fuzzy_field_bound(self, doc: Any, query_lower: str, query_chars: Counter) -> float:
+        """Cheap upper bound on _fuzzy_field_score.
+
+        partial_ratio is 2 * LCS / (len(shorter) + len(window)) for some window
+        of the longer string, and the LCS cannot exceed the characters the two
+        strings have in common, so a character histogram bounds it. The long
+        description nearly always shares every character and is taken at its
+        maximum.
+        """
+        bound = 0.0
+        for field, weight in (('name', 3.0), ('creator', 1.5), ('short_desc', 2.0)):
+            value = getattr(doc, field)
+            shorter = min(len(query_lower), len(value))
+            if not shorter:
+                continue
+            common = sum(min(count, value.count(char)) for char, count in query_chars.items())
+            # partial_ratio rounds to a whole percent
+            bound += weight * min(1.0, 2.0 * common / (shorter + common) + 0.005)
+        return bound + 1.0
+    
+    def _term_score(self, doc: Any, query_lower: str, intent: Dict[str, List[str]],
+                    intent_counts: List[Tuple[float, int]],
+                    fuzzy_terms: Optional[Dict[str, Set[str]]], score: float = 0.0) -> float:
+        """Add the intent, keyword and exact-match parts of the score to score"""
+        # Category, use case and platform intent matching, one weight per matching label
+        for weight, count in intent_counts:
+            for _ in range(count):
+                score += weight
         
         # Keyword matching
-        searchable_text = f"{agent.name} {agent.creator} {agent.short_desc} {agent.long_desc} {agent.domains} {agent.use_cases} {agent.platform}".lower()
         for keyword in intent['keywords']:
-            if keyword in searchable_text:
+            if keyword in doc.text:
                 score += 0.8
+            elif fuzzy_terms is not None:
+                # Fuzzy match against the keyword's pre-resolved close terms
+                if not doc.token_set.isdisjoint(fuzzy_terms[keyword]):
+                    score += 0.5
             else:
                 # Fuzzy match for keywords
-                words_in_text = re.findall(r'\b\w+\b', searchable_text)
-                best_match = process.extractOne(keyword, words_in_text)
-                if best_match and best_match[1] > 75:
+                best_match = process.extractOne(keyword, doc.tokens)
+                if best_match and best_match[1] > FUZZY_KEYWORD_CUTOFF:
                     score += 0.5
         
         # Boost score for exact matches in key fields
-        if query.lower() in agent.name.lower():
+        if query_lower in doc.name:
             score += 2.0
-        if query.lower() in agent.creator.lower():
+        if query_lower in doc.creator:
             score += 1.0
         
         return score
     
-    def search(self, agents: List[Any], query: str, threshold: float = 0.1) -> List[Any]:
-        """Perform intelligent search on agents"""
+    def _label_matches(self, label: str, value: str) -> bool:
+        """Check whether an intent label matches a lowercased agent field value"""
+        return label in value or fuzz.partial_ratio(label, value) > 70
+    
+    def intent_label_count(self, agent: Any, kind: str, label: str) -> int:
+        """Number of the agent's domain/use case/platform values matching one intent label"""
+        doc = agent.search_doc
+        if kind == 'categories':
+            values = doc.domain_labels
+        elif kind == 'use_cases':
+            values = doc.use_case_labels
+        else:
+            values = [doc.platform]
+        return sum(1 for value in values if self._label_matches(label, value))
+    
+    def intent_match_counts(self, agent: Any, intent: Dict[str, List[str]]) -> List[Tuple[float, int]]:
+        """(weight, matching value count) per intent label, in scoring order"""
+        return [
+            (weight, self.intent_label_count(agent, kind, label))
+            for kind, weight in INTENT_WEIGHTS
+            for label in intent[kind]
+        ]
+    
+    def build_index(self, agents: List[Any]) -> 'SearchIndex':
+        """Build the inverted index used to narrow search candidates"""
+        self.index = SearchIndex(self, agents)
+        return self.index
+    
+    def attach_index(self, index: 'SearchIndex') -> None:
+        """Use a previously built index, e.g. one restored from a snapshot"""
+        index.searcher = self
+        self.index = index
+    
+    def search(self, agents: List[Any], query: str, threshold: float = 0.1,
+               limit: Optional[int] = None, offset: int = 0,
+               index: Optional['SearchIndex'] = None) -> List[Any]:
+        """Perform intelligent search on agents.
+
+        With a limit only the best offset + limit agents are kept in a bounded
+        heap, and agents whose cheap upper-bound score cannot beat the current
+        k-th best never get their fuzzy fields scored. index defaults to the
+        most recently built or attached one.
+        """
         if not query or not query.strip():
-            return agents
+            return agents[offset:offset + limit] if limit is not None else agents[offset:]
         
         query = query.strip()
+        query_lower = query.lower()
         intent = self.extract_intent(query)
         
-        # Calculate relevance scores
-        scored_agents = []
-        for agent in agents:
-            relevance_score = self.calculate_relevance_score(agent, query, intent)
-            if relevance_score > threshold:
-                scored_agents.append((agent, relevance_score))
-        
-        # Sort by relevance score (descending)
-        scored_agents.sort(key=lambda x: x[1], reverse=True)
+        # Only score agents sharing candidate terms with the query when the
+        # index covers the list being searched
+        fuzzy_terms = None
+        fuzzy_only: List[Tuple[int, Any]] = []
+        if index is None:
+            index = self.index
+        if index is not None and index.covers(agents):
+            fuzzy_terms = index.resolve_keywords(intent['keywords'])
+            if limit is None:
+                ordinals = range(len(index.agents))
+            else:
+                ordinals = index.candidate_ordinals(query, intent, fuzzy_terms)
+                # Every other agent can still score on its fuzzy fields alone
+                fuzzy_only = index.ordinals_outside(ordinals)
+            candidates = [
+                (ordinal, index.agents[ordinal], index.intent_match_counts(ordinal, intent))
+                for ordinal in ordinals
+            ]
+        else:
+            candidates = [
+                (position, agent, self.intent_match_counts(agent, intent))
+                for position, agent in enumerate(agents)
+            ]
         
-        # Return only the agents (without scores)
-        results = [agent for agent, score in scored_agents]
+        if limit is None:
+            # Calculate relevance scores
+            scored_agents = []
+            for _, agent, counts in candidates:
+                relevance_score = self.calculate_relevance_score(agent, query, intent, fuzzy_terms, counts)
+                if relevance_score > threshold:
+                    scored_agents.append((agent, relevance_score))
+            
+            # Sort by relevance score (descending)
+            scored_agents.sort(key=lambda x: x[1], reverse=True)
+            
+            # Return only the agents (without scores)
+            ranked = [agent for agent, score in scored_agents]
+        else:
+            ranked = self._top_k(candidates, query_lower, intent, fuzzy_terms,
+                                 threshold, offset + limit, fuzzy_only)
+        results = ranked[offset:]
         
         # If no results above threshold, try a more lenient search
-        if not results:
+        if not ranked:
             # Try fuzzy matching on names only with lower threshold
             name_matches = []
             for agent in agents:
-                name_score = fuzz.partial_ratio(query.lower(), agent.name.lower())
-                creator_score = fuzz.partial_ratio(query.lower(), agent.creator.lower())
+                name_score = fuzz.partial_ratio(query_lower, agent.search_doc.name)
+                creator_score = fuzz.partial_ratio(query_lower, agent.search_doc.creator)
                 if name_score > 50 or creator_score > 60:
                     name_matches.append((agent, max(name_score, creator_score)))
             
             if name_matches:
                 name_matches.sort(key=lambda x: x[1], reverse=True)
                 results = [agent for agent, score in name_matches[:10]]  # Limit to top 10
+                results = results[offset:]
+        
+        if limit is not None:
+            results = results[:limit]
         
         return results
+    
+    def _top_k(self, candidates: List[Tuple[int, Any, List[Tuple[float, int]]]], query_lower: str,
+               intent: Dict[str, List[str]], fuzzy_terms: Optional[Dict[str, Set[str]]],
+               threshold: float, k: int, fuzzy_only: List[Tuple[int, Any]] = ()) -> List[Any]:
+        """Best k candidates, ranked like a full stable sort, with upper-bound pruning.
+
+        fuzzy_only lists (position, agent) pairs that match no query term or
+        intent, so only their fuzzy fields can score. They are bounded, and
+        scored, only while MAX_FUZZY_FIELD_SCORE could still reach the top k.
+        """
+        if k <= 0:
+            return []
+        
+        # Cheap part of every score plus a bound on what the fuzzy fields can add
+        query_chars = Counter(query_lower)
+        bounded = []
+        for position, agent, counts in candidates:
+            doc = agent.search_doc
+            upper_bound = (self._term_score(doc, query_lower, intent, counts, fuzzy_terms)
+                           + self._fuzzy_field_bound(doc, query_lower, query_chars))
+            bounded.append((upper_bound, position, agent, counts))
+        
+        # Min-heap of (score, -position): the root is the current k-th best,
+        # and earlier positions win ties as they do in a stable sort
+        heap: List[Tuple[float, int, Any]] = []
+        self._push_bounded(heap, bounded, query_lower, intent, fuzzy_terms, threshold, k)
+        if fuzzy_only and (len(heap) < k or heap[0][0] <= MAX_FUZZY_FIELD_SCORE + SCORE_EPSILON):
+            no_counts = [(weight, 0) for kind, weight in INTENT_WEIGHTS for _ in intent[kind]]
+            bounded = [
+                (self._fuzzy_field_bound(agent.search_doc, query_lower, query_chars), position, agent, no_counts)
+                for position, agent in fuzzy_only
+            ]
+            self._push_bounded(heap, bounded, query_lower, intent, fuzzy_terms, threshold, k)
+        
+        heap.sort(key=lambda entry: (-entry[0], -entry[1]))
+        return [agent for _, _, agent in heap]
+    
+    def _push_bounded(self, heap: List[Tuple[float, int, Any]],
+                      bounded: List[Tuple[float, int, Any, List[Tuple[float, int]]]], query_lower: str,
+                      intent: Dict[str, List[str]], fuzzy_terms: Optional[Dict[str, Set[str]]],
+                      threshold: float, k: int) -> None:
+        """Score bounded candidates best bound first into the top-k heap, until none can enter"""
+        bounded.sort(key=lambda item: (-item[0], item[1]))
+        for upper_bound, position, agent, counts in bounded:
+            if upper_bound <= threshold:
+                break
+            if len(heap) == k and upper_bound < heap[0][0] - SCORE_EPSILON:
+                # Remaining candidates are sorted by bound, none can enter the heap
+                break
+            doc = agent.search_doc
+            score = self._term_score(doc, query_lower, intent, counts, fuzzy_terms,
+                                     self._fuzzy_field_score(doc, query_lower))
+            if score <= threshold:
+                continue
+            entry = (score, -position, agent)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[:2] > heap[0][:2]:
+                heapq.heapreplace(heap, entry)
+
+class SearchIndex:
+    """Token-level inverted index over an agent list.
+
+    Every agent field is tokenized once at build time and each posting is the
+    set of ordinals of the agents a term occurs in. At query time the agents
+    that share a candidate term with the query, or match one of its intents,
+    are the only ones that can earn more than their fuzzy field score; every
+    other agent is bounded by MAX_FUZZY_FIELD_SCORE, which lets a top-k search
+    skip them once the k-th best score is above it.
+
+    An index that is being searched is never modified: extended() returns a
+    copy with more agents that shares every posting it does not change.
+    """
+    
+    def __init__(self, searcher: IntelligentSearch, agents: List[Any]):
+        self.searcher = searcher
+        self.agents: List[Any] = []
+        # term -> ordinals of the agents using it in any indexed field
+        self.postings: Dict[str, Set[int]] = {}
+        # name/creator term -> ordinals, for the exact match boosts
+        self.name_postings: Dict[str, Set[int]] = {}
+        self.creator_postings: Dict[str, Set[int]] = {}
+        # (intent kind, label) -> {ordinal: matching value count}, filled lazily on first use
+        self.intent_postings: Dict[Tuple[str, str], Dict[int, int]] = {}
+        # Typo-tolerant lookup over every term in postings
+        self.vocabulary = FuzzyVocabulary()
+        # Index being extended, whose postings must be copied before a write
+        self._base: Optional['SearchIndex'] = None
+        for agent in agents:
+            self.add(agent)
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # The searcher carries per-process query caches; it is re-attached on load
+        state = self.__dict__.copy()
+        state['searcher'] = None
+        return state
+    
+    def add(self, agent: Any) -> None:
+        """Index a single agent, appending it to the indexed list"""
+        ordinal = len(self.agents)
+        self.agents.append(agent)
+        base = self._base
+        
+        doc = agent.search_doc
+        for field in INDEXED_FIELDS:
+            for term in TOKEN_PATTERN.findall(getattr(doc, field)):
+                if term not in self.postings:
+                    self.vocabulary.add(term)
+                _writable(self.postings, base and base.postings, term, set).add(ordinal)
+        
+        for term in TOKEN_PATTERN.findall(doc.name):
+            _writable(self.name_postings, base and base.name_postings, term, set).add(ordinal)
+        for term in TOKEN_PATTERN.findall(doc.creator):
+            _writable(self.creator_postings, base and base.creator_postings, term, set).add(ordinal)
+        
+        for key in list(self.intent_postings):
+            kind, label = key
+            count = self.searcher.intent_label_count(agent, kind, label)
+            if count:
+                _writable(self.intent_postings, base and base.intent_postings, key, dict)[ordinal] = count
+    
+    def extended(self, agents: List[Any]) -> 'SearchIndex':
+        """Copy of this index with agents appended; this one is left as it was"""
+        index = copy.copy(self)
+        # copy() goes through __getstate__, which drops the searcher
+        index.searcher = self.searcher
+        index.agents = list(self.agents)
+        index.postings = dict(self.postings)
+        index.name_postings = dict(self.name_postings)
+        index.creator_postings = dict(self.creator_postings)
+        index.intent_postings = dict(self.intent_postings)
+        index.vocabulary = self.vocabulary.extended()
+        index._base = self
+        try:
+            for agent in agents:
+                index.add(agent)
+        finally:
+            index._base = None
+            index.vocabulary._base = None
+        return index
+    
+    def covers(self, agents: List[Any]) -> bool:
+        """Check whether the given list is exactly the indexed agent list"""
+        if agents is self.agents:
+            return True
+        if len(agents) != len(self.agents):
+            return False
+        return all(a is b for a, b in zip(agents, self.agents))
+    
+    def ordinals_outside(self, ordinals: List[int]) -> List[Tuple[int, Any]]:
+        """(ordinal, agent) of every indexed agent not among the sorted ordinals"""
+        excluded = set(ordinals)
+        return [(ordinal, agent) for ordinal, agent in enumerate(self.agents) if ordinal not in excluded]
+    
+    def _terms_containing(self, fragment: str, postings: Dict[str, Any]) -> List[str]:
+        """Terms of postings that contain the fragment as a substring"""
+        return [term for term in self.vocabulary.terms_containing(fragment) if term in postings]
+    
+    def _intent_counts(self, kind: str, label: str) -> Dict[int, int]:
+        """Agents earning score for an intent label, computed once per label"""
+        key = (kind, label)
+        if key not in self.intent_postings:
+            counts = {}
+            for ordinal, agent in enumerate(self.agents):
+                count = self.searcher.intent_label_count(agent, kind, label)
+                if count:
+                    counts[ordinal] = count
+            self.intent_postings[key] = counts
+        return self.intent_postings[key]
+    
+    def intent_match_counts(self, ordinal: int, intent: Dict[str, List[str]]) -> List[Tuple[float, int]]:
+        """Indexed equivalent of IntelligentSearch.intent_match_counts"""
+        return [
+            (weight, self._intent_counts(kind, label).get(ordinal, 0))
+            for kind, weight in INTENT_WEIGHTS
+            for label in intent[kind]
+        ]
+    
+    def resolve_keywords(self, keywords: List[str]) -> Dict[str, Set[str]]:
+        """Map each query keyword to its close vocabulary terms, once per query"""
+        return {keyword: self.vocabulary.lookup(keyword) for keyword in keywords}
+    
+    def candidates(self, query: str, intent: Dict[str, List[str]],
+                   fuzzy_terms: Dict[str, Set[str]]) -> List[Any]:
+        """Agents sharing at least one candidate term or intent with the query, in index order"""
+        return [self.agents[ordinal] for ordinal in self.candidate_ordinals(query, intent, fuzzy_terms)]
+    
+    def candidate_ordinals(self, query: str, intent: Dict[str, List[str]],
+                           fuzzy_terms: Dict[str, Set[str]]) -> List[int]:
+        """Sorted ordinals of the agents returned by candidates()"""
+        ordinals: Set[int] = set()
+        
+        # Keywords hit an agent when they are a substring of one of its tokens,
+        # or one of the keyword's fuzzy vocabulary matches
+        for keyword in intent['keywords']:
+            for term in self._terms_containing(keyword, self.postings):
+                ordinals.update(self.postings[term])
+            for term in fuzzy_terms[keyword]:
+                ordinals.update(self.postings[term])
+        
+        for kind, _ in INTENT_WEIGHTS:
+            for label in intent[kind]:
+                ordinals.update(self._intent_counts(kind, label))
+        
+        # Exact name/creator boosts: the longest query token must sit inside one
+        # of the field's tokens, then confirm the full substring
+        query_lower = query.lower()
+        query_terms = TOKEN_PATTERN.findall(query_lower)
+        if query_terms:
+            anchor = max(query_terms, key=len)
+            for field, postings in (('name', self.name_postings), ('creator', self.creator_postings)):
+                for term in self._terms_containing(anchor, postings):
+                    for ordinal in postings[term]:
+                        if query_lower in getattr(self.agents[ordinal].search_doc, field):
+                            ordinals.add(ordinal)
+        else:
+            for ordinal, agent in enumerate(self.agents):
+                doc = agent.search_doc
+                if query_lower in doc.name or query_lower in doc.creator:
+                    ordinals.add(ordinal)
+        
+        return sorted(ordinals)
+
+
+def _writable(mapping: Dict[Any, Any], base: Optional[Dict[Any, Any]], key: Any, factory: Callable) -> Any:
+    """mapping[key] ready for writing: created if missing, copied if still shared with base"""
+    container = mapping.get(key)
+    if container is None:
+        container = mapping[key] = factory()
+    elif base is not None and base.get(key) is container:
+        container = mapping[key] = factory(container)
+    return container
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton reporting every pattern found in a text.
+
+    Patterns are matched as plain substrings, overlapping ones included, so
+    a single pass over the text gives the same hits as testing each pattern
+    with `in`.
+    """
+    
+    def __init__(self, patterns: Dict[str, List[Any]]):
+        # Trie transitions, failure links and payloads per state
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Set[Any]] = [set()]
+        
+        for pattern, payloads in patterns.items():
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                state = next_state
+            self.output[state].update(payloads)
+        
+        # Breadth-first pass to link each state to its longest proper suffix state
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+    
+    def find(self, text: str) -> Set[Any]:
+        """Payloads of all patterns occurring anywhere in text"""
+        found: Set[Any] = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                found |= self.output[state]
+        return found
+
+
+class FuzzyVocabulary:
+    """Character bigram index for typo-tolerant term lookups.
+
+    A lookup must find every term that extractOne would accept, i.e. every
+    term whose WRatio with the keyword is above FUZZY_KEYWORD_CUTOFF. After
+    fuzzywuzzy's ASCII processing such a term either shares a character
+    bigram with the keyword, is a substring of it (terms of 1-2 characters
+    inside a longer keyword), or is the keyword with one character deleted
+    (pairs of 7 characters or fewer). Candidates are gathered from those
+    three sources and confirmed with WRatio itself. The same bigrams answer
+    substring lookups without scanning the vocabulary.
+    """
+    
+    MAX_CACHED_LOOKUPS = 10000
+    
+    def __init__(self):
+        self.terms: Set[str] = set()
+        # processed form -> terms that process to it
+        self.processed: Dict[str, Set[str]] = {}
+        # bigram -> terms containing it, raw or processed
+        self.bigrams: Dict[str, Set[str]] = {}
+        self._lookups: Dict[str, Set[str]] = {}
+        # Vocabulary being extended, whose sets must be copied before a write
+        self._base: Optional['FuzzyVocabulary'] = None
+    
+    @staticmethod
+    def _bigrams(word: str) -> Set[str]:
+        return {word[i:i + 2] for i in range(len(word) - 1)}
+    
+    def add(self, term: str) -> None:
+        """Register a vocabulary term"""
+        if term in self.terms:
+            return
+        self.terms.add(term)
+        base = self._base
+        processed = utils.full_process(term, force_ascii=True)
+        _writable(self.processed, base and base.processed, processed, set).add(term)
+        for bigram in self._bigrams(term) | self._bigrams(processed):
+            _writable(self.bigrams, base and base.bigrams, bigram, set).add(term)
+        self._lookups.clear()
+    
+    def extended(self) -> 'FuzzyVocabulary':
+        """Copy to add terms to, sharing every set until it is written"""
+        vocabulary = FuzzyVocabulary()
+        vocabulary.terms = set(self.terms)
+        vocabulary.processed = dict(self.processed)
+        vocabulary.bigrams = dict(self.bigrams)
+        vocabulary._base = self
+        return vocabulary
+    
+    def terms_containing(self, fragment: str) -> Set[str]:
+        """Terms that contain the fragment as a substring"""
+        if len(fragment) < 2:
+            return {term for term in self.terms if fragment in term}
+        postings = sorted((self.bigrams.get(bigram, set()) for bigram in self._bigrams(fragment)), key=len)
+        return {term for term in postings[0].intersection(*postings[1:]) if fragment in term}
+    
+    def _candidates(self, keyword: str) -> Set[str]:
+        """Superset of the terms scoring above the cut-off against keyword"""
+        processed = utils.full_process(keyword, force_ascii=True)
+        if not processed:
+            return set()
+        # Too short to share a bigram with its close matches
+        if len(processed) <= 2:
+            return set(self.terms)
+        
+        candidates: Set[str] = set()
+        for bigram in self._bigrams(processed):
+            candidates.update(self.bigrams.get(bigram, ()))
+        length = len(processed)
+        pieces = {processed[start:start + 2] for start in range(length - 1)} | set(processed)
+        pieces.update(processed[:i] + processed[i + 1:] for i in range(length))
+        for piece in pieces:
+            candidates.update(self.processed.get(piece, ()))
+        return candidates
+    
+    def lookup(self, keyword: str) -> Set[str]:
+        """Vocabulary terms that fuzzily match the keyword"""
+        matches = self._lookups.get(keyword)
+        if matches is not None:
+            return matches
+        
+        matches = {term for term in self._candidates(keyword)
+                   if fuzz.WRatio(keyword, term) > FUZZY_KEYWORD_CUTOFF}
+        if len(self._lookups) >= self.MAX_CACHED_LOOKUPS:
+            self._lookups.clear()
+        self._lookups[keyword] = matches
+        return matches
 
 
 # Global instance for use in routes
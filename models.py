@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Dict, Any
 import re
 import os
+import sys
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
@@ -9,9 +10,76 @@ import logging
 from werkzeug.security import check_password_hash
 import uuid
 
-@dataclass
+SEARCH_TOKEN_PATTERN = re.compile(r'\b\w+\b')
+
+
+def intern_list(values: List[str]) -> List[str]:
+    """Intern every string in a list of short, frequently repeated values"""
+    return [sys.intern(value) for value in values]
+
+
+def create_slug(name: str) -> str:
+    """Create the URL-safe slug used for an agent name"""
+    # Remove special characters and convert to lowercase
+    slug = re.sub(r'[^\w\s-]', '', name.lower())
+    # Replace spaces and multiple hyphens with single hyphen
+    slug = re.sub(r'[-\s]+', '-', slug)
+    return slug.strip('-')
+
+
+@dataclass(slots=True)
+class SearchDocument:
+    """Lowercased, pre-tokenized view of an Agent read by IntelligentSearch"""
+    name: str
+    creator: str
+    short_desc: str
+    long_desc: str
+    domains: str
+    use_cases: str
+    platform: str
+    text: str
+    tokens: List[str]
+    token_set: frozenset
+    domain_labels: List[str]
+    use_case_labels: List[str]
+    
+    @classmethod
+    def from_agent(cls, agent: 'Agent') -> 'SearchDocument':
+        """Normalize the searchable fields of an agent once"""
+        name = agent.name.lower()
+        creator = sys.intern(agent.creator.lower())
+        short_desc = agent.short_desc.lower()
+        long_desc = agent.long_desc.lower()
+        domains = sys.intern(agent.domains.lower())
+        use_cases = sys.intern(agent.use_cases.lower())
+        platform = sys.intern(agent.platform.lower())
+        text = f"{name} {creator} {short_desc} {long_desc} {domains} {use_cases} {platform}"
+        # Tokens repeat across the whole catalog, so share one copy of each
+        tokens = intern_list(SEARCH_TOKEN_PATTERN.findall(text))
+        return cls(
+            name=name,
+            creator=creator,
+            short_desc=short_desc,
+            long_desc=long_desc,
+            domains=domains,
+            use_cases=use_cases,
+            platform=platform,
+            text=text,
+            tokens=tokens,
+            token_set=frozenset(tokens),
+            # Intent matching splits on commas, unlike domain_list/use_case_list
+            domain_labels=intern_list(domains.split(',')),
+            use_case_labels=intern_list(use_cases.split(','))
+        )
+
+
+@dataclass(slots=True)
 class Agent:
-    """Model class for representing an AI Agent"""
+    """Model class for representing an AI Agent.
+
+    Slotted, with repeated values (creators, platforms, domains, pricing
+    tiers, ...) interned so large catalogs share a single copy of each.
+    """
     name: str
     domains: str
     use_cases: str
@@ -26,8 +94,30 @@ class Agent:
     legitimacy: str
     what_users_think: str = ""
     
+    # Derived in __post_init__
+    slug: str = field(init=False, repr=False, compare=False)
+    average_rating: float = field(init=False, repr=False, compare=False)
+    review_count: int = field(init=False, repr=False, compare=False)
+    domain_list: List[str] = field(init=False, repr=False, compare=False)
+    use_case_list: List[str] = field(init=False, repr=False, compare=False)
+    platform_list: List[str] = field(init=False, repr=False, compare=False)
+    pricing_clean: str = field(init=False, repr=False, compare=False)
+    primary_use_case: str = field(init=False, repr=False, compare=False)
+    primary_domain: str = field(init=False, repr=False, compare=False)
+    search_doc: SearchDocument = field(init=False, repr=False, compare=False)
+    
     def __post_init__(self):
         """Clean and process agent data after initialization"""
+        # Share one copy of the low-cardinality columns
+        self.domains = sys.intern(self.domains)
+        self.use_cases = sys.intern(self.use_cases)
+        self.creator = sys.intern(self.creator)
+        self.platform = sys.intern(self.platform)
+        self.pricing = sys.intern(self.pricing)
+        self.underlying_model = sys.intern(self.underlying_model)
+        self.deployment = sys.intern(self.deployment)
+        self.legitimacy = sys.intern(self.legitimacy)
+        
         # Create a URL-safe slug for the agent
         self.slug = self._create_slug(self.name)
         
@@ -36,16 +126,16 @@ class Agent:
         self.review_count = 0
         
         # Parse domains into a list
-        self.domain_list = [d.strip() for d in self.domains.split(';') if d.strip()]
+        self.domain_list = intern_list([d.strip() for d in self.domains.split(';') if d.strip()])
         
         # Parse use cases into a list
-        self.use_case_list = [u.strip() for u in self.use_cases.split(';') if u.strip()]
+        self.use_case_list = intern_list([u.strip() for u in self.use_cases.split(';') if u.strip()])
         
         # Parse platforms into a list
-        self.platform_list = [p.strip() for p in self.platform.split(';') if p.strip()]
+        self.platform_list = intern_list([p.strip() for p in self.platform.split(';') if p.strip()])
         
         # Clean pricing information
-        self.pricing_clean = self._clean_pricing(self.pricing)
+        self.pricing_clean = sys.intern(self._clean_pricing(self.pricing))
         
         # Extract primary use case for filtering
         self.primary_use_case = self.use_case_list[0] if self.use_case_list else "General"
@@ -55,14 +145,13 @@ class Agent:
         
         # Ensure URL has proper protocol
         self.url = self._clean_url(self.url)
+        
+        # Precompute the normalized search document
+        self.search_doc = SearchDocument.from_agent(self)
     
     def _create_slug(self, name: str) -> str:
         """Create a URL-safe slug from agent name"""
-        # Remove special characters and convert to lowercase
-        slug = re.sub(r'[^\w\s-]', '', name.lower())
-        # Replace spaces and multiple hyphens with single hyphen
-        slug = re.sub(r'[-\s]+', '-', slug)
-        return slug.strip('-')
+        return create_slug(name)
     
     def _clean_pricing(self, pricing: str) -> str:
         """Clean and standardize pricing information"""
@@ -0,0 +1,44 @@
+"""
+Per-process memory usage, split into memory shared with other workers and memory unique to this one
+"""
+
+import logging
+import os
+from typing import Dict, Union
+
+# smaps_rollup fields reported, in kB
+SMAPS_FIELDS = {
+    'Rss': 'rss_kb',
+    'Pss': 'pss_kb',
+    'Shared_Clean': 'shared_clean_kb',
+    'Shared_Dirty': 'shared_dirty_kb',
+    'Private_Clean': 'private_clean_kb',
+    'Private_Dirty': 'private_dirty_kb',
+}
+
+
+def read_process_memory(pid: Union[int, str] = 'self') -> Dict[str, int]:
+    """Memory of a process from /proc/<pid>/smaps_rollup.
+
+    uss_kb (unique set size) is the memory only this process maps; with a
+    preloaded, frozen catalog it is what each extra worker really costs.
+    Returns an empty dict where smaps_rollup is unavailable (non-Linux).
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        return {}
+
+    memory = {}
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in SMAPS_FIELDS:
+                    memory[SMAPS_FIELDS[name]] = int(value.split()[0])
+    except (OSError, ValueError) as e:
+        logging.error(f"Error reading process memory: {e}")
+        return {}
+
+    memory['uss_kb'] = memory.get('private_clean_kb', 0) + memory.get('private_dirty_kb', 0)
+    memory['pid'] = os.getpid() if pid == 'self' else int(pid)
+    return memory
@@ -1,38 +1,250 @@
 """
 Rating system for AI agents with star ratings and text feedback
 """
+import bisect
 import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
 from datetime import datetime
 import logging
+from append_log import AppendLog
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+
+# Reviews with feedback shown per agent
+RECENT_REVIEWS_PER_AGENT = 5
+
+# Newest reviews with feedback kept across all agents for get_recent_reviews
+RECENT_FEEDBACK_SIZE = 100
+
+# Bayesian leaderboard prior: every agent starts with this many virtual
+# ratings of this value. The prior is fixed (not the live site average) so
+# that a new rating only moves the agent it belongs to.
+BAYESIAN_PRIOR_MEAN = 3.0
+BAYESIAN_PRIOR_WEIGHT = 5
+
+
+@dataclass
+class RatingAggregate:
+    """Running count, sum and 1-5 histogram of one agent's ratings"""
+    count: int = 0
+    total: float = 0.0
+    histogram: Dict[int, int] = field(default_factory=lambda: {value: 0 for value in RATING_VALUES})
+    
+    def add(self, rating: float):
+        """Fold one rating into the aggregate"""
+        self.count += 1
+        self.total += rating
+        # Decimal ratings are counted under the nearest whole star
+        rounded_rating = round(rating)
+        if rounded_rating in self.histogram:
+            self.histogram[rounded_rating] += 1
+    
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class RecentReviews:
+    """The newest reviews with feedback, bounded to capacity entries.
+
+    Entries are kept ordered by timestamp; ties keep insertion order, like a
+    stable newest-first sort of every review would.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._keys: List[Tuple[str, int]] = []
+        self._entries: List[Dict[str, Any]] = []
+    
+    def add(self, rating_entry: Dict[str, Any], sequence: int):
+        """Offer a review; it is kept only if it is among the newest capacity ones"""
+        # Oldest first; among equal timestamps the earliest added sorts last
+        key = (rating_entry['timestamp'], -sequence)
+        if len(self._keys) >= self.capacity and key <= self._keys[0]:
+            return
+        position = bisect.bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._entries.insert(position, rating_entry)
+        if len(self._keys) > self.capacity:
+            del self._keys[0]
+            del self._entries[0]
+    
+    def newest(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to limit reviews, newest first"""
+        newest = self._entries[::-1]
+        return newest if limit is None else newest[:limit]
+
+
+class Leaderboard:
+    """Agents with at least min_ratings ratings, kept sorted as ratings arrive.
+
+    Ordered by score, then rating count, then first rating, all descending
+    except the last, matching a stable sort of agents in first-rated order.
+    """
+    
+    def __init__(self, min_ratings: int, bayesian: bool = False):
+        self.min_ratings = min_ratings
+        self.bayesian = bayesian
+        self._keys: List[Tuple[float, int, int]] = []
+        self._slugs: List[str] = []
+        self._key_by_slug: Dict[str, Tuple[float, int, int]] = {}
+    
+    def score(self, aggregate: RatingAggregate) -> float:
+        """Ranking score: the displayed average, or the Bayesian average"""
+        if self.bayesian:
+            return ((BAYESIAN_PRIOR_WEIGHT * BAYESIAN_PRIOR_MEAN + aggregate.total)
+                    / (BAYESIAN_PRIOR_WEIGHT + aggregate.count))
+        return round(aggregate.average, 1)
+    
+    def update(self, slug: str, aggregate: RatingAggregate, first_rated: int):
+        """Re-rank one agent after its aggregate changed"""
+        if aggregate.count < self.min_ratings:
+            return
+        old_key = self._key_by_slug.get(slug)
+        if old_key is not None:
+            position = bisect.bisect_left(self._keys, old_key)
+            del self._keys[position]
+            del self._slugs[position]
+        key = (-self.score(aggregate), -aggregate.count, first_rated)
+        position = bisect.bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._slugs.insert(position, slug)
+        self._key_by_slug[slug] = key
+    
+    def top(self, limit: int) -> List[str]:
+        """Slugs of the best limit agents"""
+        return self._slugs[:limit]
+
 
 class RatingSystem:
-    """Handles ratings and reviews for AI agents"""
+    """Handles ratings and reviews for AI agents.
+
+    Ratings are stored in an append-only JSON-lines log, so a new rating costs
+    one appended line instead of a rewrite of every rating. The legacy
+    ratings.json array is imported into the log the first time it is opened.
+
+    Every gunicorn worker has its own instance on the same log. Appends are
+    serialized by a file lock, and each read first ingests whatever other
+    workers appended since (refresh), so no rating is lost or served stale.
+    """
     
-    def __init__(self, ratings_file: str = "ratings.json"):
+    def __init__(self, ratings_file: str = "ratings.json", log_file: Optional[str] = None):
         self.ratings_file = ratings_file
-        self.ratings = self._load_ratings()
+        self.log = AppendLog(
+            log_file or os.path.splitext(ratings_file)[0] + '.jsonl',
+            fsync_interval=float(os.environ.get('RATINGS_FSYNC_INTERVAL', 1.0)),
+            fsync_batch=int(os.environ.get('RATINGS_FSYNC_BATCH', 32))
+        )
+        self._refresh_lock = threading.RLock()
+        self._leaderboards: Dict[Tuple[int, bool], Leaderboard] = {}
+        # Bumped whenever any aggregate changes, for caches built on top of them
+        self.version = 0
+        self._reset()
+        self._load_ratings()
     
-    def _load_ratings(self) -> List[Dict[str, Any]]:
-        """Load ratings from JSON file"""
+    def _reset(self):
+        """Forget every indexed rating, keeping the leaderboards that are in use"""
+        self.ratings: List[Dict[str, Any]] = []
+        self.aggregates: Dict[str, RatingAggregate] = {}
+        self.recent_reviews: Dict[str, RecentReviews] = {}
+        self.recent_feedback = RecentReviews(RECENT_FEEDBACK_SIZE)
+        # Slug -> position of its first rating, the leaderboard tie-breaker
+        self._first_rated: Dict[str, int] = {}
+        self._leaderboards = {key: Leaderboard(*key) for key in self._leaderboards}
+        self._indexed_count = 0
+        self.version += 1
+    
+    def _load_ratings(self):
+        """Load ratings from the log, importing the legacy JSON file if there is no log yet"""
         try:
-            if os.path.exists(self.ratings_file):
-                with open(self.ratings_file, 'r') as f:
-                    ratings_data = json.load(f)
-                    return ratings_data if isinstance(ratings_data, list) else []
-            return []
+            # Held so that only one worker imports the legacy file
+            with self.log.lock:
+                if not self.log.exists():
+                    ratings = self._load_legacy_ratings()
+                    if ratings:
+                        self.log.compact(ratings)
+                        logging.info(f"Imported {len(ratings)} ratings from {self.ratings_file} into {self.log.path}")
+                        for rating_entry in ratings:
+                            self._ingest(rating_entry)
+                    return
+                
+                self.refresh()
+                # With the lock held nobody is mid-append, so a partial line is torn
+                if self.log.invalid_lines or self.log.partial_bytes:
+                    # Drop the torn tail of an interrupted append
+                    self.log.compact(self.ratings)
         except Exception as e:
             logging.error(f"Error loading ratings: {e}")
-            return []
     
-    def _save_ratings(self):
-        """Save ratings to JSON file"""
+    def refresh(self) -> bool:
+        """Ingest ratings appended by other processes since the last call.
+        
+        Costs one stat() when the log is unchanged. If another process
+        compacted the log, everything is re-indexed from the new file.
+        Returns True if anything changed.
+        """
+        with self._refresh_lock:
+            try:
+                replaced, records = self.log.read_changes()
+            except Exception as e:
+                logging.error(f"Error refreshing ratings: {e}")
+                return False
+            if replaced:
+                self._reset()
+            for rating_entry in records:
+                if self._is_valid(rating_entry):
+                    self._ingest(rating_entry)
+            return replaced or bool(records)
+    
+    def _ingest(self, rating_entry: Dict[str, Any]):
+        self.ratings.append(rating_entry)
+        self._index_rating(rating_entry)
+    
+    def _load_legacy_ratings(self) -> List[Dict[str, Any]]:
+        """Load ratings from the JSON array file used before the log"""
+        if os.path.exists(self.ratings_file):
+            with open(self.ratings_file, 'r') as f:
+                ratings_data = json.load(f)
+                return ratings_data if isinstance(ratings_data, list) else []
+        return []
+    
+    @staticmethod
+    def _is_valid(rating_entry: Any) -> bool:
+        return isinstance(rating_entry, dict) and 'agent_slug' in rating_entry and 'rating' in rating_entry
+    
+    def _index_rating(self, rating_entry: Dict[str, Any]):
+        """Update the per-agent aggregates and recent reviews with one rating"""
+        slug = rating_entry['agent_slug']
+        self._indexed_count += 1
+        self.version += 1
+        aggregate = self.aggregates.get(slug)
+        if aggregate is None:
+            aggregate = self.aggregates[slug] = RatingAggregate()
+            self.recent_reviews[slug] = RecentReviews(RECENT_REVIEWS_PER_AGENT)
+            self._first_rated[slug] = len(self._first_rated)
+        aggregate.add(rating_entry['rating'])
+        if rating_entry.get('feedback', '').strip():
+            self.recent_reviews[slug].add(rating_entry, aggregate.count)
+            self.recent_feedback.add(rating_entry, self._indexed_count)
+        for leaderboard in self._leaderboards.values():
+            leaderboard.update(slug, aggregate, self._first_rated[slug])
+    
+    def compact(self):
+        """Rewrite the log from the ratings in memory.
+
+        Every logged rating stays live, so this only ever drops malformed
+        lines; add_rating() calls it once one shows up.
+        """
         try:
-            with open(self.ratings_file, 'w') as f:
-                json.dump(self.ratings, f, indent=2, default=str)
+            with self.log.lock:
+                # Catch up first so ratings from other workers are kept
+                self.refresh()
+                self.log.compact(self.ratings)
         except Exception as e:
-            logging.error(f"Error saving ratings: {e}")
+            logging.error(f"Error compacting ratings log: {e}")
     
     def add_rating(self, agent_slug: str, rating: int, feedback: str = "", 
                    user_identifier: str = "") -> bool:
@@ -51,8 +263,13 @@ class RatingSystem:
                 'user_identifier': user_identifier or 'anonymous'
             }
             
-            self.ratings.append(rating_entry)
-            self._save_ratings()
+            self.log.append(rating_entry)
+            # Indexes the new rating along with any other worker's, in log order
+            self.refresh()
+            # A worker that crashed mid-append leaves a torn line, which the
+            # next append terminates; rewrite the log without it
+            if self.log.invalid_lines:
+                self.compact()
             
             logging.info(f"Added rating {rating}/5 for agent {agent_slug}")
             return True
@@ -62,10 +279,11 @@ class RatingSystem:
             return False
     
     def get_agent_ratings(self, agent_slug: str) -> Dict[str, Any]:
-        """Get all ratings data for a specific agent"""
-        agent_ratings = [r for r in self.ratings if r['agent_slug'] == agent_slug]
+        """Get all ratings data for a specific agent, from its aggregate and recent reviews"""
+        self.refresh()
+        aggregate = self.aggregates.get(agent_slug)
         
-        if not agent_ratings:
+        if aggregate is None:
             return {
                 'average_rating': 0,
                 'total_ratings': 0,
@@ -73,65 +291,58 @@ class RatingSystem:
                 'recent_reviews': []
             }
         
-        # Calculate statistics
-        ratings_values = [r['rating'] for r in agent_ratings]
-        average_rating = sum(ratings_values) / len(ratings_values)
-        
-        # Ratings breakdown - handle decimal ratings by rounding to nearest integer
-        breakdown = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        for rating in ratings_values:
-            rounded_rating = round(rating)
-            if rounded_rating in breakdown:
-                breakdown[rounded_rating] += 1
-        
-        # Recent reviews with feedback
-        recent_reviews = [
-            r for r in sorted(agent_ratings, key=lambda x: x['timestamp'], reverse=True)
-            if r['feedback'].strip()
-        ][:5]  # Last 5 reviews with feedback
-        
         return {
-            'average_rating': round(average_rating, 1),
-            'total_ratings': len(agent_ratings),
-            'ratings_breakdown': breakdown,
-            'recent_reviews': recent_reviews
+            'average_rating': round(aggregate.average, 1),
+            'total_ratings': aggregate.count,
+            'ratings_breakdown': dict(aggregate.histogram),
+            'recent_reviews': self.recent_reviews[agent_slug].newest()
         }
     
-    def get_top_rated_agents(self, min_ratings: int = 3, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get top-rated agents with minimum number of ratings"""
-        agent_stats = {}
-        
-        # Calculate stats for each agent
-        for rating in self.ratings:
-            slug = rating['agent_slug']
-            if slug not in agent_stats:
-                agent_stats[slug] = []
-            agent_stats[slug].append(rating['rating'])
+    def get_top_rated_agents(self, min_ratings: int = 3, limit: int = 10,
+                             bayesian: bool = False) -> List[Dict[str, Any]]:
+        """Get top-rated agents with minimum number of ratings.
+
+        Each (min_ratings, bayesian) combination gets a leaderboard that is
+        built on first use and kept sorted as ratings arrive, so reading it
+        costs O(limit). With bayesian=True agents are ranked by their rating
+        shrunk towards BAYESIAN_PRIOR_MEAN, so a handful of perfect scores
+        cannot outrank a long track record.
+        """
+        self.refresh()
+        leaderboard_key = (min_ratings, bayesian)
+        leaderboard = self._leaderboards.get(leaderboard_key)
+        if leaderboard is None:
+            with self._refresh_lock:
+                leaderboard = Leaderboard(min_ratings, bayesian)
+                for slug, aggregate in self.aggregates.items():
+                    leaderboard.update(slug, aggregate, self._first_rated[slug])
+                self._leaderboards[leaderboard_key] = leaderboard
         
-        # Filter and sort by average rating
         top_agents = []
-        for slug, ratings_list in agent_stats.items():
-            if len(ratings_list) >= min_ratings:
-                avg_rating = sum(ratings_list) / len(ratings_list)
-                top_agents.append({
-                    'agent_slug': slug,
-                    'average_rating': round(avg_rating, 1),
-                    'total_ratings': len(ratings_list)
-                })
-        
-        # Sort by average rating, then by number of ratings
-        top_agents.sort(key=lambda x: (x['average_rating'], x['total_ratings']), reverse=True)
-        
-        return top_agents[:limit]
+        for slug in leaderboard.top(limit):
+            aggregate = self.aggregates[slug]
+            entry = {
+                'agent_slug': slug,
+                'average_rating': round(aggregate.average, 1),
+                'total_ratings': aggregate.count
+            }
+            if bayesian:
+                entry['bayesian_rating'] = round(leaderboard.score(aggregate), 2)
+            top_agents.append(entry)
+        return top_agents
     
     def get_recent_reviews(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent reviews with feedback"""
+        self.refresh()
+        if limit <= self.recent_feedback.capacity:
+            return self.recent_feedback.newest(limit)
+        
         reviews_with_feedback = [
             r for r in self.ratings 
-            if r['feedback'].strip()
+            if r.get('feedback', '').strip()
         ]
         
         # Sort by timestamp (newest first)
         reviews_with_feedback.sort(key=lambda x: x['timestamp'], reverse=True)
         
-        return reviews_with_feedback[:limit]
\ No newline at end of file
+        return reviews_with_feedback[:limit]
@@ -4,9 +4,11 @@ Recipe data loader for AI Agent Recipes
 
 import pandas as pd
 import os
+import time
 from typing import List, Dict, Any
 from dataclasses import dataclass
 import logging
+from slug_index import SlugIndex
 
 
 @dataclass
@@ -80,12 +82,18 @@ class Recipe:
         }
 
 
+# CSV columns, in the order the loader unpacks them
+RECIPE_CSV_COLUMNS = ('Recipe Name', 'Detailed Synopsis', 'Target Audience', 'Why It Works', 'Source Link(s)')
+
+
 class RecipeLoader:
     """Class to handle loading and processing recipe data from CSV"""
     
     def __init__(self, csv_path: str = "recipes_full_content.csv"):
         self.csv_path = csv_path
         self.recipes = []
+        self.recipes_by_slug = SlugIndex('recipe')
+        self.load_metrics: Dict[str, Any] = {}
         self._load_data()
     
     def _load_data(self):
@@ -95,31 +103,42 @@ class RecipeLoader:
                 logging.error(f"Recipe CSV file not found: {self.csv_path}")
                 return
             
-            df = pd.read_csv(self.csv_path)
+            started = time.perf_counter()
+            # Read every column as text; empty cells become '' rather than 'nan'
+            df = pd.read_csv(self.csv_path, dtype=str, keep_default_na=False)
+            for column in RECIPE_CSV_COLUMNS:
+                if column not in df.columns:
+                    df[column] = ''
             logging.info(f"Loading recipes from {self.csv_path}")
             
-            for _, row in df.iterrows():
+            columns = [df[column].tolist() for column in RECIPE_CSV_COLUMNS]
+            for name, detailed_synopsis, target_audience, why_it_works, source_links in zip(*columns):
                 try:
-                    detailed_synopsis = str(row.get('Detailed Synopsis', ''))
                     # Create a shorter synopsis from the first sentence of detailed synopsis
                     short_synopsis = detailed_synopsis.split('.')[0] + '.' if detailed_synopsis else ''
                     if len(short_synopsis) > 200:
                         short_synopsis = short_synopsis[:200] + '...'
                     
                     recipe = Recipe(
-                        name=str(row.get('Recipe Name', '')),
+                        name=name,
                         synopsis=short_synopsis,
                         detailed_synopsis=detailed_synopsis,
-                        target_audience=str(row.get('Target Audience', '')),
-                        why_it_works=str(row.get('Why It Works', '')),
-                        source_links=str(row.get('Source Link(s)', ''))
+                        target_audience=target_audience,
+                        why_it_works=why_it_works,
+                        source_links=source_links
                     )
                     self.recipes.append(recipe)
                 except Exception as e:
                     logging.error(f"Error processing recipe row: {e}")
                     continue
             
-            logging.info(f"Loaded {len(self.recipes)} recipes")
+            self.recipes_by_slug.rebuild(self.recipes)
+            self.load_metrics = {
+                'csv_rows': len(df),
+                'recipes': len(self.recipes),
+                'total_seconds': round(time.perf_counter() - started, 4)
+            }
+            logging.info(f"Loaded {len(self.recipes)} recipes in {self.load_metrics['total_seconds']}s")
             
         except Exception as e:
             logging.error(f"Error loading recipe data: {e}")
@@ -137,10 +156,7 @@ class RecipeLoader:
     
     def get_recipe_by_slug(self, slug: str):
         """Get a specific recipe by its slug"""
-        for recipe in self.recipes:
-            if recipe.slug == slug:
-                return recipe
-        return None
+        return self.recipes_by_slug.get(slug)
 
 
 # Global instance for use in routes
@@ -11,8 +11,7 @@ from models import db, GoogleWorkspaceIDPIntegration, IDPIntegration, User, Orga
 import google.auth
 from google.oauth2 import service_account
 import requests as pyrequests
-from rating_system import RatingSystem
-from intelligent_search import intelligent_search
+from process_memory import read_process_memory
 from sqlalchemy import func, extract
 from functools import wraps
 import uuid
@@ -23,8 +22,8 @@ import re
 discovery_bp = Blueprint('discovery', __name__)
 main_bp = Blueprint('main', __name__)
 
-# Create instances
-rating_system = RatingSystem()
+# Share the data loader's ratings rather than opening the log a second time
+rating_system = data_loader.rating_system
 
 # Discovery blueprint routes
 @discovery_bp.route('/discovery/idp', methods=['POST'])
@@ -304,6 +303,11 @@ def _fetch_okta_apps(integration):
     }), 200
 
 # Main blueprint routes
+@main_bp.before_request
+def refresh_ratings():
+    """Pick up other workers' ratings once per request, not once per agent card"""
+    display_ratings.refresh()
+
 @main_bp.context_processor
 def inject_user():
     user_id = session.get('user_id')
@@ -332,9 +336,6 @@ def index():
     # Get filtered agents
     agents = data_loader.search_agents(query, filters)
     
-    # Get filter options for the UI
-    filter_options = data_loader.get_filter_options()
-    
     # Get top 6 recipes for homepage
     top_recipes = recipe_loader.get_top_recipes(6)
     
@@ -905,9 +906,12 @@ def api_agents_search():
     # Apply filters
     filtered_agents = all_agents
     
-    if query:
+    if query and not (category or pricing):
+        # Only the first page is needed, so let the search keep just the top results
+        filtered_agents = data_loader.search_agents(query, limit=limit)
+    elif query:
         # Use intelligent search for natural language queries
-        filtered_agents = intelligent_search.search(filtered_agents, query)
+        filtered_agents = data_loader.search_agents(query)
     
     if category:
         filtered_agents = [a for a in filtered_agents if category.lower() in a.primary_domain.lower()]
@@ -995,23 +999,14 @@ def api_categories():
     """API endpoint for getting all categories and domains"""
     all_agents = data_loader.get_all_agents()
     
-    # Extract unique domains and use cases
-    domains = set()
-    use_cases = set()
-    creators = set()
-    pricing_models = set()
-    
-    for agent in all_agents:
-        domains.update(agent.domain_list)
-        use_cases.update(agent.use_case_list)
-        creators.add(agent.creator)
-        pricing_models.add(agent.pricing_clean)
+    # Unique domains, use cases, creators and pricing, cached per catalog
+    options = data_loader.get_category_options()
     
     return jsonify({
-        "domains": sorted(list(domains)),
-        "use_cases": sorted(list(use_cases)),
-        "creators": sorted(list(creators)),
-        "pricing_models": sorted(list(pricing_models)),
+        "domains": options['domains'],
+        "use_cases": options['use_cases'],
+        "creators": options['creators'],
+        "pricing_models": options['pricing_models'],
         "total_agents": len(all_agents),
         "metadata": {
             "last_updated": data_loader.get_last_updated_time(),
@@ -1143,7 +1138,8 @@ def api_search():
     
     return jsonify({
         'agents': results,
-        'total': len(results)
+        'total': len(results),
+        'facets': data_loader.get_facet_counts(query, filters)
     })
 
 @main_bp.route('/add-agent', methods=['POST'])
@@ -1438,15 +1434,9 @@ def blog_list():
     elif tag:
         posts = blog_loader.get_posts_by_tag(tag)
     
-    # Apply search if query provided
+    # Apply search if query provided: ranked by relevance from the blog full-text index
     if search_query:
-        filtered_posts = []
-        for post in posts:
-            if (search_query.lower() in post.title.lower() or 
-                search_query.lower() in post.content.lower() or
-                search_query.lower() in post.excerpt.lower()):
-                filtered_posts.append(post)
-        posts = filtered_posts
+        posts = blog_loader.search_posts(search_query, posts)
     
     # Pagination
     page = request.args.get('page', 1, type=int)
@@ -1488,27 +1478,16 @@ def blog_detail(slug):
     if post.publish_date > datetime.now():
         abort(404)
     
-    # Get related posts (same category or tags)
-    all_posts = blog_loader.get_published_posts()
-    related_posts = []
-    
-    for p in all_posts:
-        if p.slug != slug:
-            # Check if same category or has common tags
-            if (p.category == post.category or 
-                any(tag in p.tags for tag in post.tags)):
-                related_posts.append(p)
-                if len(related_posts) >= 3:
-                    break
+    # Get related posts (shared tags, then same category), precomputed at load
+    related_posts = blog_loader.get_related_posts(post)
     
     # Generate SEO metadata
     page_title = f"{post.title} | Top Agents Blog"
     meta_description = post.meta_description
     canonical_url = f"{os.environ.get('BASE_URL', 'https://top-agents.us')}/blog/{post.slug}"
     
-    # Convert markdown to HTML
-    import markdown
-    html_content = markdown.markdown(post.content, extensions=['fenced_code', 'tables', 'codehilite'])
+    # Rendered once per post content, then served from the loader's cache
+    html_content = blog_loader.get_post_html(post)
     
     return render_template('blog_detail.html',
                          post=post,
@@ -1685,6 +1664,40 @@ def superadmin_dashboard(user):
     all_orgs = Organization.query.order_by(Organization.name).all()
     return render_template('superadmin.html', users=all_users, orgs=all_orgs)
 
+@main_bp.route('/admin/catalog-stats')
+@require_superadmin
+def catalog_stats(user):
+    """Catalog load, search cache, duplicate slug and worker memory counters"""
+    return jsonify({
+        'catalog_version': data_loader.catalog_version,
+        'total_agents': len(data_loader.get_all_agents()),
+        'load_metrics': data_loader.load_metrics,
+        # Memory of the worker serving this request; uss_kb is what it does not share
+        'worker_memory': read_process_memory(),
+        'search_cache': data_loader.search_cache.stats(),
+        'duplicate_slugs': {
+            'agents': data_loader.agents_by_slug.duplicates,
+            'recipes': recipe_loader.recipes_by_slug.duplicates,
+            'blog_posts': blog_loader.posts_by_slug.duplicates
+        }
+    })
+
+@main_bp.route('/admin/submissions')
+@require_superadmin
+def admin_submissions(user):
+    """User agent submissions awaiting review"""
+    return jsonify({'submissions': data_loader.get_pending_submissions()})
+
+@main_bp.route('/admin/submissions/<submission_id>/<action>', methods=['POST'])
+@require_superadmin
+def admin_review_submission(user, submission_id, action):
+    """Approve or reject a user agent submission"""
+    if action not in ('approve', 'reject'):
+        return jsonify({'success': False, 'error': 'Unknown action'}), 400
+    if not data_loader.review_user_agent(submission_id, approve=action == 'approve'):
+        return jsonify({'success': False, 'error': 'Submission not found or already reviewed'}), 404
+    return jsonify({'success': True, 'catalog_version': data_loader.catalog_version})
+
 @main_bp.route('/auth/google-demo', methods=['POST'])
 def google_auth_demo():
     """Demo Google OAuth authentication for testing purposes only."""
@@ -0,0 +1,90 @@
+"""
+Memory benchmark for the in-memory agent catalog.
+
+Builds synthetic catalogs of increasing size from the rows of the bundled
+CSV (with unique names) and reports the traced bytes per agent: the Agent
+objects with their search documents, the search index, and the rest of the
+Catalog (facet index, slug index and filter values). The per-agent cost of
+each should stay flat as the catalog grows.
+
+With --unique-facets every copy also gets its own creator and model, the
+worst case for the facet index.
+
+Usage: python scripts/benchmark_catalog_memory.py [--unique-facets] [size ...]
+"""
+import csv
+import gc
+import os
+import sys
+import tracemalloc
+
+# Ensure project root is in sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from catalog import Catalog
+from intelligent_search import IntelligentSearch, SearchIndex
+from models import Agent
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'combined_ai_agents_directory.csv')
+AGENT_FIELDS = ['name', 'domains', 'use_cases', 'short_desc', 'long_desc', 'creator', 'url',
+                'platform', 'pricing', 'underlying_model', 'deployment', 'legitimacy']
+CREATOR_FIELD = AGENT_FIELDS.index('creator')
+MODEL_FIELD = AGENT_FIELDS.index('underlying_model')
+
+
+def load_rows():
+    with open(CSV_PATH, newline='', encoding='utf-8') as csvfile:
+        return [[row.get(field) or '' for field in AGENT_FIELDS] for row in csv.DictReader(csvfile)]
+
+
+def build_agents(rows, size, unique_facets=False):
+    agents = []
+    for i in range(size):
+        values = list(rows[i % len(rows)])
+        # Copies of the text fields, as if each row had been parsed separately
+        values = [''.join(value) for value in values]
+        values[0] = f"{values[0]} {i}"
+        if unique_facets:
+            values[CREATOR_FIELD] = f"{values[CREATOR_FIELD]} {i}"
+            values[MODEL_FIELD] = f"{values[MODEL_FIELD]} {i}"
+        agents.append(Agent(*values))
+    return agents
+
+
+def traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure(rows, size, searcher, unique_facets=False):
+    """Traced bytes of the agents, the search index and the rest of the Catalog"""
+    gc.collect()
+    tracemalloc.start()
+    agents = build_agents(rows, size, unique_facets)
+    after_agents = traced_bytes()
+    search_index = SearchIndex(searcher, agents)
+    after_search = traced_bytes()
+    catalog = Catalog(agents, search_index)
+    after_catalog = traced_bytes()
+    tracemalloc.stop()
+    del catalog, search_index, agents
+    return after_agents, after_search - after_agents, after_catalog - after_search
+
+
+def main():
+    args = sys.argv[1:]
+    unique_facets = '--unique-facets' in args
+    sizes = [int(arg) for arg in args if arg != '--unique-facets'] or [1000, 10000, 100000]
+    rows = load_rows()
+    # Built outside the traced region: its keyword tables do not grow with the catalog
+    searcher = IntelligentSearch()
+    print(f"{'agents':>8} {'MiB':>8} {'agents':>8} {'search':>8} {'catalog':>8} {'total':>8}  (bytes/agent)")
+    for size in sizes:
+        agent_bytes, search_bytes, rest_bytes = measure(rows, size, searcher, unique_facets)
+        total = agent_bytes + search_bytes + rest_bytes
+        print(f"{size:>8} {total / 2**20:>8.1f} {agent_bytes / size:>8.0f} {search_bytes / size:>8.0f} "
+              f"{rest_bytes / size:>8.0f} {total / size:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
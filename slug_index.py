@@ -0,0 +1,51 @@
+"""
+Slug lookup maps for agents, recipes and blog posts
+"""
+
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+
+class SlugIndex:
+    """Slug to object map that keeps the first object per slug and reports duplicates.
+
+    The loaders used to resolve slugs with a linear scan, where the first
+    match wins; the map keeps that behavior and records every slug that is
+    shadowed by a later object with the same slug.
+    """
+
+    def __init__(self, kind: str, items: Optional[Iterable[Any]] = None):
+        self.kind = kind
+        self._items: Dict[str, Any] = {}
+        # Slug -> number of objects sharing it, for slugs seen more than once
+        self.duplicates: Dict[str, int] = {}
+        if items is not None:
+            self.rebuild(items)
+
+    def rebuild(self, items: Iterable[Any]) -> None:
+        """Replace the map with the slugs of items, in order"""
+        self._items = {}
+        self.duplicates = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item: Any) -> None:
+        """Index one object, logging a warning if its slug is already taken"""
+        slug = item.slug
+        if slug not in self._items:
+            self._items[slug] = item
+            return
+
+        self.duplicates[slug] = self.duplicates.get(slug, 1) + 1
+        logging.warning(f"Duplicate {self.kind} slug '{slug}': "
+                        f"{getattr(item, 'name', None) or getattr(item, 'title', '')} is unreachable")
+
+    def get(self, slug: str) -> Optional[Any]:
+        """Object for slug, or None"""
+        return self._items.get(slug)
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
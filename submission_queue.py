@@ -0,0 +1,193 @@
+"""
+Append-only queue of user agent submissions, folded into JSON files in batches
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from append_log import AppendLog
+from file_storage import FileLock, write_json_atomic
+
+REVIEW_STATUSES = ('approved', 'rejected')
+PENDING_STATUS = 'pending_review'
+
+
+class SubmissionQueue:
+    """User agent submissions and review decisions, queued as appended lines.
+
+    A submission costs one appended line; flush() folds everything queued
+    in one locked rewrite and empties the queue. The background compactor
+    calls it every few seconds, so a burst of /add-agent posts is written as
+    a single batch. Replaying a queue that was already folded in (a crash
+    between the two steps) is harmless: entries are keyed by their
+    uuid-based id.
+
+    Submissions awaiting review are kept in their own file, next to
+    user_agents.json rather than in it: user_agents.json is a catalog
+    source, so it is only rewritten when a review decision changes it.
+    """
+
+    def __init__(self, store_path: str = "user_agents.json", queue_path: Optional[str] = None,
+                 pending_path: Optional[str] = None):
+        base_path = os.path.splitext(store_path)[0]
+        self.store_path = store_path
+        self.pending_path = pending_path or base_path + '.pending.json'
+        self.queue = AppendLog(
+            queue_path or base_path + '.queue.jsonl',
+            fsync_interval=float(os.environ.get('SUBMISSIONS_FSYNC_INTERVAL', 1.0)),
+            fsync_batch=int(os.environ.get('SUBMISSIONS_FSYNC_BATCH', 32))
+        )
+        self.store_lock = FileLock(f"{store_path}.lock")
+        # Serializes this process's reads of the queue, which move its read offset
+        self._read_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._stop_compacting = threading.Event()
+
+    @staticmethod
+    def new_id() -> str:
+        return f"user_{uuid.uuid4().hex}"
+
+    def submit(self, submission: Dict[str, Any]) -> str:
+        """Queue a new submission, assigning it an id; returns the id"""
+        submission = dict(submission, id=self.new_id())
+        self.queue.append({'op': 'submit', 'submission': submission})
+        return submission['id']
+
+    def review(self, submission_id: str, status: str) -> Optional[Dict[str, Any]]:
+        """Queue a review decision; returns the reviewed submission.
+
+        Only pending submissions can be reviewed: None is returned for an
+        unknown id or one that already has a decision. The queue lock is
+        held from the check to the append, so two workers cannot both
+        decide on the same submission.
+        """
+        if status not in REVIEW_STATUSES:
+            raise ValueError(f"Unknown review status: {status}")
+        with self.queue.lock:
+            submission = self.get(submission_id)
+            if submission is None or submission.get('status') != PENDING_STATUS:
+                return None
+            record = {'op': 'review', 'id': submission_id, 'status': status,
+                      'reviewed_date': datetime.now().isoformat()}
+            self.queue.append(record)
+        self._apply_review(submission, record)
+        return submission
+
+    def get(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        submission = self._current().get(submission_id)
+        return dict(submission, id=submission_id) if submission is not None else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Every submission, stored or still queued, in submission order.
+
+        Each carries the id review() accepts for it, which for legacy
+        entries is their positional key rather than the stored id until the
+        next flush gives them one of their own.
+        """
+        return [dict(submission, id=submission_id) for submission_id, submission in self._current().items()]
+
+    def pending(self) -> List[Dict[str, Any]]:
+        return [s for s in self.all() if s.get('status') == PENDING_STATUS]
+
+    def _current(self) -> "OrderedDict[str, Dict[str, Any]]":
+        with self._read_lock:
+            submissions = self._key_by_id(self._read_json(self.store_path) + self._read_json(self.pending_path))
+            self._apply(submissions, self.queue.read_all())
+        return submissions
+
+    @staticmethod
+    def _read_json(path: str) -> List[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _key_by_id(stored: List[Dict[str, Any]]) -> "OrderedDict[str, Dict[str, Any]]":
+        """Stored submissions keyed by id"""
+        submissions = OrderedDict()
+        id_counts = Counter(submission.get('id') for submission in stored)
+        for position, submission in enumerate(stored):
+            # Entries without an id, or sharing one with another entry (the
+            # old timestamp-based ids could collide), keep their position as key
+            submission_id = submission.get('id')
+            if not submission_id or id_counts[submission_id] > 1:
+                submission_id = f"legacy_{position}"
+            submissions[submission_id] = submission
+        return submissions
+
+    def _apply(self, submissions: Dict[str, Dict[str, Any]], records: List[Dict[str, Any]]):
+        for record in records:
+            if record.get('op') == 'submit':
+                submission = record['submission']
+                submissions[submission['id']] = submission
+            elif record.get('op') == 'review':
+                # A decision only ever applies to a submission still pending
+                submission = submissions.get(record.get('id'))
+                if submission is not None and submission.get('status') == PENDING_STATUS:
+                    self._apply_review(submission, record)
+
+    @staticmethod
+    def _apply_review(submission: Dict[str, Any], record: Dict[str, Any]):
+        submission['status'] = record['status']
+        submission['reviewed'] = True
+        submission['reviewed_date'] = record['reviewed_date']
+
+    def flush(self) -> int:
+        """Fold the queue into the stored files; returns how many records were folded.
+
+        Pending submissions go to the pending file; user_agents.json is only
+        rewritten when its reviewed entries changed. Legacy entries, keyed
+        by position, are given a stored id of their own here, as the fold
+        can move them.
+        """
+        # Same order as review(): the queue lock before the read lock
+        with self.queue.lock, self._read_lock, self.store_lock:
+            records = self.queue.read_all()
+            if not records and not self.queue.invalid_lines:
+                return 0
+            stored = self._read_json(self.store_path)
+            # Shallow copies: reviews only set top-level keys of an entry
+            stored_before = [dict(submission) for submission in stored]
+            submissions = self._key_by_id(stored + self._read_json(self.pending_path))
+            self._apply(submissions, records)
+            for key, submission in submissions.items():
+                if submission.get('id') != key:
+                    submission['id'] = self.new_id()
+            reviewed = [s for s in submissions.values() if s.get('status') != PENDING_STATUS]
+            pending = [s for s in submissions.values() if s.get('status') == PENDING_STATUS]
+            if reviewed != stored_before:
+                write_json_atomic(self.store_path, reviewed, indent=2)
+            write_json_atomic(self.pending_path, pending, indent=2)
+            self.queue.compact([])
+        logging.info(f"Folded {len(records)} queued submission records into {self.pending_path}")
+        return len(records)
+
+    def start_compactor(self, interval: float):
+        """Flush the queue every interval seconds in a background thread"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._stop_compacting.clear()
+
+        def compact():
+            while not self._stop_compacting.wait(interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    logging.error(f"Error flushing submission queue: {e}")
+
+        self._compactor = threading.Thread(target=compact, name='submission-compactor', daemon=True)
+        self._compactor.start()
+
+    def stop_compactor(self):
+        """Stop the background compactor"""
+        self._stop_compacting.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
@@ -0,0 +1,190 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import blog_loader as blog_loader_module
+from blog_loader import BlogLoader
+
+
+def write_post(blog_dir, slug, title, body, publish_date="2024-02-01", category="Guides", tags="[ai]"):
+    (blog_dir / f"{slug}.md").write_text(
+        f"---\ntitle: {title}\nslug: {slug}\npublish_date: '{publish_date}'\n"
+        f"category: {category}\ntags: {tags}\n---\n\n{body}\n"
+    )
+
+
+@pytest.fixture
+def blog_dir(tmp_path):
+    blog_dir = tmp_path / "blogs"
+    blog_dir.mkdir()
+    write_post(blog_dir, "first-post", "First Post", "# Hello\n\nSome **bold** text.")
+    write_post(blog_dir, "second-post", "Second Post", "```python\nprint('hi')\n```")
+    return blog_dir
+
+
+def count_renders(monkeypatch):
+    calls = []
+    render = blog_loader_module.markdown.markdown
+
+    def counting_render(text, **kwargs):
+        calls.append(text)
+        return render(text, **kwargs)
+
+    monkeypatch.setattr(blog_loader_module.markdown, 'markdown', counting_render)
+    return calls
+
+
+def test_post_html_is_rendered_once(blog_dir, monkeypatch):
+    """Repeated views of a post reuse the HTML rendered on the first view."""
+    loader = BlogLoader(str(blog_dir))
+    calls = count_renders(monkeypatch)
+    post = loader.get_post_by_slug("first-post")
+
+    html = loader.get_post_html(post)
+    assert "<strong>bold</strong>" in html
+    assert loader.get_post_html(post) is html
+    assert len(calls) == 1
+
+
+def test_reload_only_rerenders_changed_posts(blog_dir, monkeypatch):
+    """Editing a file invalidates its cached HTML; untouched posts stay cached."""
+    loader = BlogLoader(str(blog_dir))
+    assert loader.warm_html_cache() == 2
+    calls = count_renders(monkeypatch)
+
+    write_post(blog_dir, "first-post", "First Post", "Rewritten body.")
+    loader.reload()
+
+    assert len(loader.html_cache) == 1
+    assert "Rewritten body." in loader.get_post_html(loader.get_post_by_slug("first-post"))
+    assert "print" in loader.get_post_html(loader.get_post_by_slug("second-post"))
+    assert len(calls) == 1
+
+
+def test_edited_post_is_reparsed_before_it_is_served(blog_dir):
+    """A file edited under a running loader never serves stale offsets or HTML."""
+    loader = BlogLoader(str(blog_dir))
+    post = loader.get_post_by_slug("first-post")
+    old_html = loader.get_post_html(post)
+    stat = os.stat(blog_dir / "first-post.md")
+
+    # Longer frontmatter moves the body; the old offsets now point into it
+    write_post(blog_dir, "first-post", "First Post, Retitled At Some Length", "Brand new body. \u00e9t\u00e9")
+    os.utime(blog_dir / "first-post.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert post.content.strip() == "Brand new body. \u00e9t\u00e9"
+    assert "Brand new body" in loader.get_post_html(post)
+
+    fresh = loader.get_post_by_slug("first-post")
+    assert fresh is not post
+    assert fresh.title == "First Post, Retitled At Some Length"
+    assert "Brand new body" in loader.get_post_html(fresh)
+    assert old_html not in loader.html_cache.values()
+
+def test_search_ranks_title_matches_first_and_requires_every_word(blog_dir):
+    """BM25 ranking favours title hits; posts must contain all query words."""
+    write_post(blog_dir, "support-agents", "Customer Support Agents", "Agents that answer tickets.",
+               category="Support", tags="[support]")
+    write_post(blog_dir, "coding-tools", "Coding Tools", "Mentions customer support once.")
+    loader = BlogLoader(str(blog_dir))
+
+    assert [p.slug for p in loader.search_posts("customer support")] == ["support-agents", "coding-tools"]
+    assert [p.slug for p in loader.search_posts("support tickets")] == ["support-agents"]
+    assert [p.slug for p in loader.search_posts("agent")] == ["support-agents"]
+    assert loader.search_posts("") == []
+
+
+def test_search_words_match_inside_terms_and_exact_terms_rank_first(blog_dir):
+    """A query word matches any term containing it, like the old substring search."""
+    write_post(blog_dir, "chatgpt-review", "ChatGPT Review", "A look at ChatGPT plugins.")
+    write_post(blog_dir, "gpt-basics", "GPT Basics", "How a GPT model works.")
+    loader = BlogLoader(str(blog_dir))
+
+    assert [p.slug for p in loader.search_posts("gpt")] == ["gpt-basics", "chatgpt-review"]
+    assert [p.slug for p in loader.search_posts("plugin")] == ["chatgpt-review"]
+
+
+def test_short_words_and_stopwords_only_match_whole_terms(blog_dir):
+    """"ml" and "to" do not expand into every term containing them."""
+    write_post(blog_dir, "ml-guide", "How To Pick ML Tools", "A guide to ML.")
+    write_post(blog_dir, "email-tips", "Email Tips", "Detailed HTML training on email tools.")
+    loader = BlogLoader(str(blog_dir))
+
+    assert [p.slug for p in loader.search_posts("ml")] == ["ml-guide"]
+    assert [p.slug for p in loader.search_posts("how to")] == ["ml-guide"]
+    # Stopwords are left out when the query has other words
+    assert [p.slug for p in loader.search_posts("the tools for email")] == ["email-tips"]
+
+def test_search_is_limited_to_the_given_posts(blog_dir):
+    """Category and tag filters applied before the search are kept."""
+    write_post(blog_dir, "support-agents", "Customer Support Agents", "Hello support.", category="Support")
+    loader = BlogLoader(str(blog_dir))
+
+    guides = loader.get_posts_by_category("Guides")
+    assert [p.slug for p in loader.search_posts("hello")] == ["support-agents", "first-post"]
+    assert [p.slug for p in loader.search_posts("hello", guides)] == ["first-post"]
+
+
+def test_taxonomy_and_related_posts_are_precomputed(blog_dir):
+    """Category/tag lookups are case-insensitive; related posts rank shared tags first."""
+    write_post(blog_dir, "tagged-twin", "Tagged Twin", "Body.", publish_date="2024-01-15", category="News",
+               tags="[ai, Agents]")
+    write_post(blog_dir, "same-category", "Same Category", "Body.", publish_date="2024-03-01", tags="[other]")
+    write_post(blog_dir, "scheduled", "Scheduled", "Body.", publish_date="2999-01-01", tags="[ai, agents]")
+    write_post(blog_dir, "unrelated", "Unrelated", "Body.", category="News", tags="[misc]")
+    write_post(blog_dir, "first-post", "First Post", "Body.", tags="[AI, agents]")
+    loader = BlogLoader(str(blog_dir))
+
+    assert [p.slug for p in loader.get_posts_by_tag("AGENTS")] == ["scheduled", "first-post", "tagged-twin"]
+    assert {p.slug for p in loader.get_posts_by_category("guides")} == {"first-post", "second-post", "same-category", "scheduled"}
+    assert loader.get_categories() == ["Guides", "News"]
+
+    related = loader.get_related_posts(loader.get_post_by_slug("first-post"))
+    assert [p.slug for p in related] == ["tagged-twin", "second-post", "same-category"]
+
+
+def test_bodies_are_read_lazily_and_the_index_is_reused(blog_dir, monkeypatch):
+    """Posts keep only metadata; a second load parses only files that changed."""
+    loader = BlogLoader(str(blog_dir))
+    post = loader.get_post_by_slug("first-post")
+    assert post.body is None
+    assert post.content.startswith("# Hello")
+    assert post.word_count == 5 and post.reading_time == 1
+
+    parsed = []
+    parse_post = BlogLoader._parse_post
+    monkeypatch.setattr(BlogLoader, '_parse_post',
+                        lambda self, filename, *args: parsed.append(filename) or parse_post(self, filename, *args))
+    write_post(blog_dir, "third-post", "Third Post", "New body.")
+    reloaded = BlogLoader(str(blog_dir))
+
+    assert parsed == ["third-post.md"]
+    assert reloaded.get_post_by_slug("first-post").content == post.content
+    assert [p.slug for p in reloaded.search_posts("bold")] == ["first-post"]
+
+
+def test_published_view_is_cached_until_the_next_scheduled_post(blog_dir, monkeypatch):
+    """Scheduled posts go live on time; in between, the published list is reused."""
+    from datetime import datetime as real_datetime
+    write_post(blog_dir, "scheduled", "Scheduled", "Body.", publish_date="2030-01-01T09:00:00")
+    loader = BlogLoader(str(blog_dir))
+
+    class FakeDatetime(real_datetime):
+        current = real_datetime(2029, 12, 31, 12, 0)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+
+    monkeypatch.setattr(blog_loader_module, 'datetime', FakeDatetime)
+    published = loader.get_published_posts()
+    assert {p.slug for p in published} == {"first-post", "second-post"}
+    assert loader.get_published_posts() is published
+
+    FakeDatetime.current = real_datetime(2030, 1, 1, 9, 0)
+    assert [p.slug for p in loader.get_published_posts()][0] == "scheduled"
+    assert len(loader.get_published_posts()) == 3
+    assert [p.slug for p in loader.get_recent_posts(1)] == ["scheduled"]
@@ -0,0 +1,60 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog_snapshot
+from catalog_snapshot import fingerprint_sources, load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "agents.csv"
+    path.write_text("name\nCodeBuddy\n")
+    return str(path)
+
+
+def test_snapshot_round_trips_while_sources_are_unchanged(tmp_path, source):
+    """A saved payload is returned as long as the source fingerprints match."""
+    snapshot = str(tmp_path / "catalog.pkl")
+    assert save_snapshot(snapshot, fingerprint_sources([source]), {'agents': ['CodeBuddy']})
+
+    assert load_snapshot(snapshot, [source]) == {'agents': ['CodeBuddy']}
+
+
+def test_touched_source_with_same_content_keeps_the_snapshot(tmp_path, source):
+    """A new mtime alone falls back to the content hash."""
+    snapshot = str(tmp_path / "catalog.pkl")
+    save_snapshot(snapshot, fingerprint_sources([source]), {'agents': []})
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert load_snapshot(snapshot, [source]) == {'agents': []}
+
+
+def test_changed_or_missing_sources_invalidate_the_snapshot(tmp_path, source):
+    """Edits, deletions and new sources all force a rebuild."""
+    snapshot = str(tmp_path / "catalog.pkl")
+    missing = str(tmp_path / "user_agents.json")
+    save_snapshot(snapshot, fingerprint_sources([source, missing]), {'agents': []})
+    assert load_snapshot(snapshot, [source, missing]) == {'agents': []}
+
+    with open(missing, 'w') as f:
+        f.write("[]")
+    assert load_snapshot(snapshot, [source, missing]) is None
+
+    os.remove(missing)
+    with open(source, 'w') as f:
+        f.write("name\nWriteWell\n")
+    assert load_snapshot(snapshot, [source, missing]) is None
+
+
+def test_other_format_versions_are_ignored(tmp_path, source, monkeypatch):
+    """Snapshots written by an older layout are rebuilt rather than trusted."""
+    snapshot = str(tmp_path / "catalog.pkl")
+    save_snapshot(snapshot, fingerprint_sources([source]), {'agents': []})
+    monkeypatch.setattr(catalog_snapshot, 'SNAPSHOT_FORMAT_VERSION', catalog_snapshot.SNAPSHOT_FORMAT_VERSION + 1)
+
+    assert load_snapshot(snapshot, [source]) is None
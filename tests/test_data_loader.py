@@ -0,0 +1,357 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Agent
+from data_loader import DataLoader
+
+CSV_HEADER = "name,domains,use_cases,short_desc,long_desc,creator,url,platform,pricing,underlying_model,deployment,legitimacy\n"
+CSV_ROWS = [
+    'CodeBuddy,Coding,Code completion,Pair programmer,Helps developers write code,DevCorp,codebuddy.dev,Web;API,Free,GPT-4,Cloud,Verified\n',
+    'WriteWell,Writing,Content creation,Drafts marketing copy,Writes blog posts,Inkwell,writewell.io,Web,Paid,Claude,Cloud,Verified\n',
+    'VoiceBot,Voice,Call center support,Answers support calls,Speech synthesis agent,SoundAI,voicebot.ai,Mobile,Freemium,Whisper,Cloud,Verified\n',
+]
+
+
+@pytest.fixture
+def loader(tmp_path, monkeypatch):
+    """A DataLoader reading a small catalog from a temporary working directory."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "agents.csv").write_text(CSV_HEADER + "".join(CSV_ROWS))
+    return DataLoader(csv_path="agents.csv")
+
+
+def make_agent(name, domains):
+    return Agent(name=name, domains=domains, use_cases="Testing", short_desc=f"{name} agent",
+                 long_desc="", creator="Tester", url="", platform="Web", pricing="Free",
+                 underlying_model="", deployment="", legitimacy="User Submitted")
+
+
+def test_search_results_are_cached(loader):
+    """Repeated searches are served from the result cache."""
+    first = loader.search_agents("coding")
+    second = loader.search_agents("  CODING ")
+
+    assert [a.slug for a in first] == [a.slug for a in second]
+    assert first[0].name == "CodeBuddy"
+    stats = loader.search_cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_adding_an_agent_invalidates_cached_searches(loader):
+    """Approved agents show up in searches that were cached before."""
+    assert "CodeReviewer" not in [a.name for a in loader.search_agents("coding")]
+    version = loader.catalog_version
+
+    loader.add_agent(make_agent("CodeReviewer", "Coding"))
+
+    assert loader.catalog_version == version + 1
+    assert "CodeReviewer" in [a.name for a in loader.search_agents("coding")]
+
+
+def test_failed_add_leaves_the_live_catalog_alone(loader, monkeypatch):
+    """An agent that cannot be indexed is not half-published."""
+    from intelligent_search import FuzzyVocabulary
+    catalog = loader.catalog
+
+    def fail(self, term):
+        raise MemoryError()
+
+    monkeypatch.setattr(FuzzyVocabulary, 'add', fail)
+
+    count = len(catalog.agents)
+
+    with pytest.raises(MemoryError):
+        loader.add_agent(make_agent("CodeReviewer", "Coding"))
+
+    assert loader.catalog is catalog
+    assert len(catalog.agents) == count
+    assert len(catalog.search_index.agents) == len(catalog.agents)
+    assert "codereviewer" not in catalog.search_index.postings
+
+
+def test_adding_an_agent_never_modifies_a_published_catalog(loader):
+    """Requests still reading the previous catalog see it exactly as it was."""
+    catalog = loader.catalog
+    count = len(catalog.agents)
+    filter_values = {key: list(values) for key, values in catalog.filter_values().items()}
+    loader.search_agents("coding")
+
+    loader.add_agent(make_agent("CodeReviewer", "Coding; Review"))
+
+    assert loader.catalog is not catalog
+    assert len(catalog.agents) == len(catalog.search_index.agents) == count
+    assert catalog.facet_index.all_bits.bit_length() == count
+    assert "codereviewer" not in catalog.agents_by_slug
+    assert "codereviewer" not in catalog.search_index.postings
+    assert catalog.filter_values() == filter_values
+    assert "Review" in loader.get_filter_options()['domains']
+
+
+def test_search_pages_match_the_full_ranking(loader):
+    """Limited searches, with or without filters, return a page of the full ranking."""
+    full = loader.search_agents("support")
+
+    assert loader.search_agents("support", limit=1) == full[:1]
+    assert loader.search_agents("support", limit=1, offset=1) == full[1:2]
+    assert loader.search_agents("support", {'platform': 'Mobile'}, limit=1) == \
+        [a for a in full if 'Mobile' in a.platform_list][:1]
+
+
+def test_filters_and_facet_counts_use_the_facet_index(loader):
+    """Filters select through the facet bitmaps and report per-facet counts."""
+    assert [a.name for a in loader.search_agents("", {'platform': 'Web'})] == ["CodeBuddy", "WriteWell"]
+    assert [a.name for a in loader.search_agents("", {'pricing': 'Paid'})] == ["WriteWell"]
+
+    counts = loader.get_facet_counts("", {'platform': 'Web'})
+    assert counts['pricing'] == {'Free': 1, 'Paid': 1}
+    assert counts['platform'] == {'API': 1, 'Web': 2}
+
+
+def test_filter_options_are_cached_and_updated_on_approval(loader):
+    """Filter options are built once and extended in place for new agents."""
+    options = loader.get_filter_options()
+    assert options['domains'] == ["Coding", "Voice", "Writing"]
+    assert loader.get_filter_options()['domains'] is options['domains']
+
+    loader.add_agent(make_agent("TestPilot", "Testing"))
+
+    options = loader.get_filter_options()
+    assert options['domains'] == ["Coding", "Testing", "Voice", "Writing"]
+    assert options['creators'] == ["DevCorp", "Inkwell", "SoundAI", "Tester"]
+    assert loader.get_category_options()['domains'] is options['domains']
+
+
+def test_slug_lookup_keeps_the_first_agent_and_reports_duplicates(loader):
+    """Agents are found by slug through the map; shadowed slugs are recorded."""
+    original = loader.get_agent_by_slug("codebuddy")
+    loader.add_agent(make_agent("CodeBuddy", "Testing"))
+
+    assert loader.get_agent_by_slug("codebuddy") is original
+    assert loader.agents_by_slug.duplicates == {"codebuddy": 2}
+    with pytest.raises(ValueError):
+        loader.get_agent_by_slug("missing")
+
+
+def test_missing_cells_load_as_empty_strings(tmp_path, monkeypatch):
+    """Empty CSV cells and absent columns become '' rather than 'nan'."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "agents.csv").write_text(
+        "name,domains,use_cases,short_desc,long_desc,creator,url,platform,pricing,underlying_model,deployment,legitimacy\n"
+        "Sparse,Coding,,Sparse agent,,Acme,,Web,Free,,,Verified\n"
+        "007,Coding,Chat,Numeric name,,Acme,,Web,Free,1.5,,Verified\n"
+    )
+    loader = DataLoader(csv_path="agents.csv")
+
+    sparse, numeric = loader.get_all_agents()
+    assert sparse.long_desc == ""
+    assert sparse.underlying_model == ""
+    assert sparse.what_users_think == ""
+    assert numeric.name == "007"
+    assert numeric.underlying_model == "1.5"
+    assert loader.load_metrics['csv_rows'] == 2
+    assert loader.load_metrics['agents'] == 2
+
+
+def test_second_loader_starts_from_the_catalog_snapshot(loader, tmp_path):
+    """A fresh loader restores agents and search index from the snapshot."""
+    assert loader.load_metrics['source'] == 'csv'
+    assert (tmp_path / "catalog_snapshot.pkl").exists()
+
+    restored = DataLoader(csv_path="agents.csv")
+
+    assert restored.load_metrics['source'] == 'snapshot'
+    assert [a.slug for a in restored.get_all_agents()] == [a.slug for a in loader.get_all_agents()]
+    assert restored.intelligent_search.index.covers(restored.agents)
+    assert [a.name for a in restored.search_agents("support")] == \
+        [a.name for a in loader.search_agents("support")]
+
+
+def test_reload_swaps_in_a_new_catalog_and_keeps_the_old_one_intact(loader, tmp_path):
+    """Requests holding the previous catalog keep a consistent view after a reload."""
+    previous = loader.catalog
+    (tmp_path / "agents.csv").write_text(CSV_HEADER + "".join(CSV_ROWS[:1]))
+
+    assert loader.sources_changed()
+    assert loader.reload()
+
+    assert loader.catalog is not previous
+    assert loader.catalog_version == previous.version + 1
+    assert [a.name for a in previous.agents] == ["CodeBuddy", "WriteWell", "VoiceBot"]
+    assert previous.agents_by_slug.get("voicebot") is not None
+    assert [a.name for a in loader.get_all_agents()] == ["CodeBuddy"]
+    assert not loader.sources_changed()
+
+
+def test_failed_reload_keeps_serving_the_current_catalog(loader, tmp_path):
+    """A missing or unreadable CSV does not empty the live catalog."""
+    previous = loader.catalog
+    (tmp_path / "agents.csv").unlink()
+
+    assert not loader.reload()
+    assert loader.catalog is previous
+
+
+def test_auto_reload_picks_up_settled_source_changes(loader, tmp_path):
+    """The watcher reloads once the edited sources stop changing."""
+    import time
+    (tmp_path / "agents.csv").write_text(CSV_HEADER + "".join(CSV_ROWS[:2]))
+    loader.start_auto_reload(0.05)
+    try:
+        deadline = time.monotonic() + 5
+        while len(loader.get_all_agents()) != 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        loader.stop_auto_reload()
+
+    assert [a.name for a in loader.get_all_agents()] == ["CodeBuddy", "WriteWell"]
+
+
+def test_concurrent_submissions_are_not_lost(loader, tmp_path):
+    """Simultaneous /add-agent posts each end up in the pending file."""
+    import json
+    import threading
+    submissions = [{'name': f"Agent {i}", 'short_desc': "Submitted"} for i in range(20)]
+    threads = [threading.Thread(target=loader.add_user_agent, args=(data,)) for data in submissions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.submissions.flush() == 20
+    assert not (tmp_path / "user_agents.json").exists()
+    stored = json.loads((tmp_path / "user_agents.pending.json").read_text())
+    assert sorted(s['name'] for s in stored) == sorted(s['name'] for s in submissions)
+    assert len({s['id'] for s in stored}) == 20
+    assert loader.submissions.flush() == 0
+
+
+def test_submissions_can_be_queued_while_the_compactor_flushes(loader):
+    """submit() and flush() in different threads neither deadlock nor drop entries."""
+    import threading
+    names = [f"Agent {i}" for i in range(50)]
+
+    def submit():
+        for name in names:
+            loader.add_user_agent({'name': name, 'short_desc': "Submitted"})
+
+    def flush():
+        for _ in range(50):
+            loader.submissions.flush()
+
+    threads = [threading.Thread(target=submit, daemon=True), threading.Thread(target=flush, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads)
+
+    loader.submissions.flush()
+    assert sorted(s['name'] for s in loader.submissions.all()) == sorted(names)
+
+
+def test_stored_submissions_sharing_an_id_are_all_kept(loader, tmp_path):
+    """Entries with colliding legacy ids survive a flush."""
+    import json
+    stored = [{'id': "user_1700000000_0", 'name': name, 'status': "pending_review"}
+              for name in ("First", "Second")]
+    (tmp_path / "user_agents.json").write_text(json.dumps(stored))
+
+    loader.add_user_agent({'name': "Third", 'short_desc': "Submitted"})
+    loader.submissions.flush()
+
+    pending = loader.get_pending_submissions()
+    assert [s['name'] for s in pending] == ["First", "Second", "Third"]
+    assert loader.review_user_agent(pending[1]['id'], approve=False)
+    assert [s['name'] for s in loader.get_pending_submissions()] == ["First", "Third"]
+
+
+def test_legacy_submissions_get_stable_ids_on_flush(loader, tmp_path):
+    """Positional ids stop resolving once a flush writes real ids, instead of shifting."""
+    import json
+    stored = [{'name': name, 'short_desc': "Legacy", 'status': status}
+              for name, status in (("Approved", "approved"), ("First", "pending_review"),
+                                   ("Second", "pending_review"))]
+    (tmp_path / "user_agents.json").write_text(json.dumps(stored))
+    stale = {s['name']: s['id'] for s in loader.get_pending_submissions()}
+    assert stale == {"First": "legacy_1", "Second": "legacy_2"}
+
+    assert loader.review_user_agent(stale["First"], approve=False)
+
+    files = json.loads((tmp_path / "user_agents.json").read_text())
+    files += json.loads((tmp_path / "user_agents.pending.json").read_text())
+    assert all(entry['id'].startswith("user_") for entry in files)
+    assert not loader.review_user_agent(stale["Second"], approve=True)
+    pending = loader.get_pending_submissions()
+    assert [(s['name'], s['id']) for s in pending] == [("Second", files[-1]['id'])]
+    assert loader.review_user_agent(pending[0]['id'], approve=True)
+
+
+def test_only_pending_submissions_can_be_reviewed(loader, tmp_path):
+    """A second decision on a submission is refused, so it cannot go live twice."""
+    loader.add_user_agent({'name': "Helper Bot", 'short_desc': "Helps"})
+    submission_id = loader.get_pending_submissions()[0]['id']
+
+    assert loader.review_user_agent(submission_id, approve=True)
+    assert not loader.review_user_agent(submission_id, approve=True)
+    assert not loader.review_user_agent(submission_id, approve=False)
+
+    assert [a.name for a in loader.get_all_agents()].count("Helper Bot") == 1
+    assert loader.submissions.get(submission_id)['status'] == "approved"
+
+
+def test_approved_submission_goes_live_without_a_reload(loader, tmp_path, monkeypatch):
+    """Approving a queued submission publishes it in a new catalog and the stored file."""
+    loader.add_user_agent({'name': "Helper Bot", 'short_desc': "Helps", 'domains': "Support"})
+    loader.add_user_agent({'name': "Spam Bot", 'short_desc': "Spam"})
+    pending = {s['name']: s['id'] for s in loader.get_pending_submissions()}
+    catalog = loader.catalog
+    monkeypatch.setattr(loader, '_build_catalog', lambda: pytest.fail("catalog was reloaded"))
+
+    assert loader.review_user_agent(pending["Helper Bot"], approve=True)
+    assert loader.review_user_agent(pending["Spam Bot"], approve=False)
+    assert not loader.review_user_agent("user_unknown", approve=True)
+
+    # The catalog requests may still be reading is left untouched
+    assert "helper-bot" not in catalog.agents_by_slug
+    assert loader.catalog_version == catalog.version + 1
+    assert loader.get_agent_by_slug("helper-bot").name == "Helper Bot"
+    assert "spam-bot" not in loader.agents_by_slug
+    assert loader.get_pending_submissions() == []
+    assert [a.name for a in DataLoader(csv_path="agents.csv").get_all_agents()][-1] == "Helper Bot"
+
+
+def test_pending_submissions_leave_the_catalog_sources_alone(loader, tmp_path):
+    """Folding queued submissions does not make the watcher reload the catalog."""
+    (tmp_path / "user_agents.json").write_text("[]")
+    loader.reload()
+    loader.add_user_agent({'name': "Helper Bot", 'short_desc': "Helps"})
+    loader.submissions.flush()
+
+    assert (tmp_path / "user_agents.json").read_text() == "[]"
+    assert not loader.sources_changed()
+
+
+def test_other_workers_add_approved_agents_without_a_reload(loader, tmp_path, monkeypatch):
+    """A worker that did not approve an agent publishes it when its watcher fires."""
+    other = DataLoader(csv_path="agents.csv")
+    catalog = other.catalog
+    loader.add_user_agent({'name': "Helper Bot", 'short_desc': "Helps", 'domains': "Support"})
+    loader.review_user_agent(loader.get_pending_submissions()[0]['id'], approve=True)
+    for worker in (loader, other):
+        monkeypatch.setattr(worker, '_build_catalog', lambda: pytest.fail("catalog was reloaded"))
+
+    assert other.sources_changed()
+    assert other.refresh_from_sources()
+    assert "helper-bot" not in catalog.agents_by_slug
+    assert other.get_agent_by_slug("helper-bot").name == "Helper Bot"
+    assert not other.sources_changed()
+
+    catalog = loader.catalog
+    assert loader.refresh_from_sources()
+    assert loader.catalog is catalog
+    assert [a.name for a in loader.get_all_agents()].count("Helper Bot") == 1
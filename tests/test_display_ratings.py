@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from display_ratings import DisplayRatings, STARS_BY_TENTHS, NO_RATING_STARS
+from rating_system import RatingSystem
+
+
+@pytest.fixture
+def ratings(tmp_path):
+    return RatingSystem(str(tmp_path / "ratings.json"))
+
+
+def test_cards_show_ratings_recorded_after_startup(ratings):
+    """A rating added through the write path shows up on the next lookup."""
+    display = DisplayRatings(ratings)
+    assert display.get_agent_rating_display("Claude 3.5 Sonnet")['stars_display'] == NO_RATING_STARS
+
+    ratings.add_rating("claude-35-sonnet", 5)
+    ratings.add_rating("claude-35-sonnet", 4)
+
+    rating_data = display.get_agent_rating_display("Claude 3.5 Sonnet")
+    assert (rating_data['average_rating'], rating_data['review_count']) == (4.5, 2)
+    assert rating_data['stars_display'] == STARS_BY_TENTHS[45]
+    assert rating_data['stars_display'].count('★') == 4
+
+
+def test_display_entries_are_reused_until_a_new_rating(ratings):
+    """Repeated lookups for an unchanged agent return the cached entry."""
+    ratings.add_rating("chatgpt", 3)
+    display = DisplayRatings(ratings)
+
+    first = display.get_agent_rating_display("ChatGPT")
+    assert display.get_agent_rating_display("ChatGPT") is first
+    ratings.add_rating("chatgpt", 5)
+    assert display.get_agent_rating_display("ChatGPT")['average_rating'] == 4.0
+
+
+def test_other_workers_ratings_show_up_after_a_refresh(ratings, tmp_path):
+    """Card lookups do not touch the log; refresh() pulls in other workers' ratings."""
+    display = DisplayRatings(ratings)
+    assert display.get_agent_rating_display("ChatGPT")['review_count'] == 0
+
+    other_worker = RatingSystem(str(tmp_path / "ratings.json"))
+    other_worker.add_rating("chatgpt", 4)
+    assert display.get_agent_rating_display("ChatGPT")['review_count'] == 0
+
+    display.refresh()
+    assert display.get_agent_rating_display("ChatGPT")['review_count'] == 1
@@ -0,0 +1,94 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Agent
+from facet_index import DENSE_RATIO, FacetIndex
+
+
+def make_agent(name, domains, platform="Web", pricing="Free", model="GPT-4", creator="Acme"):
+    return Agent(name=name, domains=domains, use_cases="Chat", short_desc=f"{name} agent",
+                 long_desc="", creator=creator, url="", platform=platform, pricing=pricing,
+                 underlying_model=model, deployment="", legitimacy="Verified")
+
+
+@pytest.fixture
+def agents():
+    return [
+        make_agent("CodeBuddy", "Coding; Developer Tools", platform="Web; API", model="GPT-4", creator="DevCorp"),
+        make_agent("WriteWell", "Writing", pricing="Paid", model="Claude 3", creator="Inkwell"),
+        make_agent("VoiceBot", "Voice; Coding", platform="Mobile", pricing="Freemium", model="gpt-3.5", creator="OpenVoice"),
+    ]
+
+
+def test_exact_facets_and_to_a_bitmap(agents):
+    """Exact-value filters intersect as bitmaps."""
+    index = FacetIndex(agents)
+
+    assert index.match('domain', 'Coding') == 0b101
+    mask = index.filter_mask({'domain': 'Coding', 'platform': 'Web'})
+    assert index.agents_in(mask) == [agents[0]]
+    assert index.filter_mask({}) is None
+
+
+def test_substring_facets_match_case_insensitively(agents):
+    """Model and creator filters keep their substring semantics."""
+    index = FacetIndex(agents)
+
+    assert index.agents_in(index.filter_mask({'model': 'GPT'})) == [agents[0], agents[2]]
+    assert index.agents_in(index.filter_mask({'creator': 'corp', 'model': 'gpt'})) == [agents[0]]
+    assert index.filter_mask({'creator': 'nobody'}) == 0
+
+
+def test_counts_are_restricted_to_the_mask(agents):
+    """Facet counts only include agents in the given bitmap."""
+    index = FacetIndex(agents)
+    counts = index.counts(index.filter_mask({'domain': 'Coding'}))
+
+    assert counts['domain'] == {'Coding': 2, 'Developer Tools': 1, 'Voice': 1}
+    assert counts['pricing'] == {'Free': 1, 'Freemium': 1}
+    assert index.counts()['pricing'] == {'Free': 1, 'Freemium': 1, 'Paid': 1}
+
+
+def test_added_agents_get_the_next_bit(agents):
+    """Agents added later are indexed without rebuilding."""
+    index = FacetIndex(agents[:2])
+    index.add(agents[2])
+
+    assert index.contains(index.match('platform', 'Mobile'), agents[2])
+    assert not index.contains(index.match('platform', 'Mobile'), agents[0])
+
+
+def test_rare_values_keep_ordinal_arrays_and_filter_like_bitmaps():
+    """Values held by few agents are stored sparsely but match and count the same."""
+    agents = [make_agent(f"Agent {i}", "Coding; Rare" if i in (3, 50) else "Coding",
+                         creator=f"Creator {i}", model="GPT-4" if i % 2 else "Claude")
+              for i in range(4 * DENSE_RATIO)]
+    index = FacetIndex(agents)
+
+    assert isinstance(index.postings['domain']['Coding'], int)
+    assert list(index.postings['domain']['Rare']) == [3, 50]
+    assert list(index.postings['creator']['Creator 7']) == [7]
+
+    mask = index.filter_mask({'domain': 'Rare', 'creator': 'creator 5'})
+    assert index.agents_in(mask) == [agents[50]]
+    assert index.select(reversed(agents), index.match('domain', 'Rare')) == [agents[50], agents[3]]
+
+    counts = index.counts(index.filter_mask({'model': 'gpt'}))
+    assert counts['domain'] == {'Coding': 2 * DENSE_RATIO, 'Rare': 1}
+    assert counts['creator']['Creator 3'] == 1 and 'Creator 4' not in counts['creator']
+    assert index.counts()['domain']['Rare'] == 2
+
+
+def test_a_rare_value_becomes_a_bitmap_as_agents_are_added(agents):
+    """An added agent can turn a value's ordinal array into a bitmap."""
+    index = FacetIndex([make_agent(f"Agent {i}", "Coding") for i in range(DENSE_RATIO)])
+    index.add(agents[1])
+    assert not isinstance(index.postings['domain']['Writing'], int)
+
+    index.add(make_agent("Another Writer", "Writing"))
+    assert index.match('domain', 'Writing') == 0b11 << DENSE_RATIO
+    assert index.counts()['domain']['Writing'] == 2
@@ -0,0 +1,289 @@
+import copy
+import csv
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Agent
+from intelligent_search import IntelligentSearch
+
+
+def make_agent(name, domains="General AI", use_cases="Chat", short_desc="", long_desc="",
+               creator="Acme", platform="Web", pricing="Free"):
+    return Agent(
+        name=name,
+        domains=domains,
+        use_cases=use_cases,
+        short_desc=short_desc or f"{name} assistant",
+        long_desc=long_desc or f"{name} helps teams get work done.",
+        creator=creator,
+        url="example.com",
+        platform=platform,
+        pricing=pricing,
+        underlying_model="GPT-4",
+        deployment="Cloud",
+        legitimacy="Verified"
+    )
+
+
+@pytest.fixture
+def agents():
+    return [
+        make_agent("CodeBuddy", domains="Coding, Developer Tools", use_cases="Code completion",
+                   short_desc="Pair programmer for software teams", creator="DevCorp"),
+        make_agent("WriteWell", domains="Writing", use_cases="Content creation, blog posts",
+                   short_desc="Drafts marketing copy and articles", creator="Inkwell"),
+        make_agent("VoiceBot", domains="Voice, Customer Service", use_cases="Call center support",
+                   short_desc="Answers support calls with speech synthesis", creator="SoundAI"),
+        make_agent("DataLens", domains="Analytics", use_cases="Dashboards, reporting",
+                   short_desc="Turns spreadsheets into insights", creator="Lens Labs", platform="Web, API"),
+        make_agent("Tutor Pro", domains="Education", use_cases="Learning",
+                   short_desc="Personal teaching assistant", creator="Learnly"),
+    ]
+
+
+def full_scan(search, agents, query):
+    """Reference ranking: score every agent without the index"""
+    search.index = None
+    return search.search(agents, query)
+
+
+@pytest.mark.parametrize("query", [
+    "coding", "support calls", "writing blog", "analytics dashboard", "codebudy", "tutor", "ai"
+])
+def test_indexed_search_preserves_full_scan_ranking(agents, query):
+    """Indexed results are the full-scan ranking, fuzzy-only matches included."""
+    search = IntelligentSearch()
+    search.build_index(agents)
+    indexed = search.search(agents, query)
+
+    assert indexed == full_scan(search, agents, query)
+
+
+
+def load_bundled_agents():
+    """Agents from the catalog CSV shipped with the app"""
+    csv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "combined_ai_agents_directory.csv")
+    fields = ['name', 'domains', 'use_cases', 'short_desc', 'long_desc', 'creator', 'url',
+              'platform', 'pricing', 'underlying_model', 'deployment', 'legitimacy']
+    with open(csv_path, newline='', encoding='utf-8') as csvfile:
+        return [Agent(*[row.get(field) or '' for field in fields]) for row in csv.DictReader(csvfile)]
+
+
+@pytest.mark.parametrize("query", [
+    "coding", "chatbot", "transcodng", "image genration", "marketing", "legal contract", "how to"
+])
+def test_indexed_search_matches_full_scan_on_bundled_catalog(query):
+    """Fuzzy vocabulary lookups find every term extractOne accepts, so rankings match."""
+    agents = load_bundled_agents()
+    search = IntelligentSearch()
+    search.build_index(agents)
+    indexed = search.search(agents, query)
+
+    assert indexed == full_scan(search, agents, query)
+
+
+def test_index_only_scores_agents_sharing_terms(agents):
+    """Agents that share no term or intent with the query are not candidates."""
+    search = IntelligentSearch()
+    index = search.build_index(agents)
+
+    query = "speech synthesis"
+    intent = search.extract_intent(query)
+    candidates = index.candidates(query, intent, index.resolve_keywords(intent['keywords']))
+    assert [agent.name for agent in candidates] == ["VoiceBot"]
+
+
+def test_index_postings_are_ordinal_sets(agents):
+    """Each posting is the set of agents using the term in any indexed field."""
+    search = IntelligentSearch()
+    index = search.build_index(agents)
+
+    # "codebuddy" occurs in the name and long description, "programmer" in short_desc
+    assert index.postings["codebuddy"] == {0}
+    assert index.postings["programmer"] == {0}
+    assert index.postings["helps"] == {0, 1, 2, 3, 4}
+
+
+def test_vocabulary_finds_terms_containing_a_fragment(agents):
+    """Substring lookups go through the bigram index, not a vocabulary scan."""
+    index = IntelligentSearch().build_index(agents)
+
+    assert index.vocabulary.terms_containing("code") == {"code", "codebuddy"}
+    assert index.vocabulary.terms_containing("ell") == {"writewell", "inkwell"}
+    assert index.vocabulary.terms_containing("x") == set()
+    assert index._terms_containing("ell", index.name_postings) == ["writewell"]
+
+
+def test_index_add_makes_agent_searchable(agents):
+    """Agents added after the build are found by later searches."""
+    search = IntelligentSearch()
+    index = search.build_index(agents)
+    newcomer = make_agent("LawBot", domains="Legal", use_cases="Contract review",
+                          short_desc="Reviews contracts", creator="Counsel Inc")
+    index.add(newcomer)
+    agents.append(newcomer)
+
+    assert index.covers(agents)
+    assert search.search(agents, "contract")[0] is newcomer
+
+
+def test_extended_index_leaves_the_original_untouched(agents):
+    """extended() copies what it writes, so a published index never changes."""
+    search = IntelligentSearch()
+    index = search.build_index(agents)
+    search.search(agents, "coding")
+    before = copy.deepcopy((index.postings, index.name_postings, index.intent_postings,
+                            index.vocabulary.bigrams, index.vocabulary.processed))
+    newcomer = make_agent("CodeLaw", domains="Coding, Legal", use_cases="Contract review",
+                          short_desc="Reviews code contracts", creator="DevCorp")
+
+    extended = index.extended([newcomer])
+
+    assert (index.postings, index.name_postings, index.intent_postings,
+            index.vocabulary.bigrams, index.vocabulary.processed) == before
+    assert "codelaw" not in index.vocabulary.terms and len(index.agents) == len(agents)
+    assert extended.postings["devcorp"] == {0, len(agents)}
+    grown = agents + [newcomer]
+    search.attach_index(extended)
+    assert search.search(grown, "coding") == full_scan(search, grown, "coding")
+
+def test_search_falls_back_to_full_scan_for_unindexed_lists(agents):
+    """Lists that are not the indexed catalog are scanned without the index."""
+    search = IntelligentSearch()
+    search.build_index(agents)
+    subset = agents[:2]
+
+    assert not search.index.covers(subset)
+    assert search.search(subset, "coding")[0].name == "CodeBuddy"
+
+
+def test_agent_search_document_is_normalized():
+    """Agents carry a lowercased, pre-tokenized search document."""
+    agent = make_agent("Code-Buddy", domains="Coding, Developer Tools", use_cases="Code completion",
+                       short_desc="Pair Programmer", creator="DevCorp", platform="Web; API")
+    doc = agent.search_doc
+
+    assert doc.name == "code-buddy"
+    assert doc.domain_labels == ["coding", " developer tools"]
+    assert doc.platform == "web; api"
+    assert doc.tokens[:3] == ["code", "buddy", "devcorp"]
+    assert "programmer" in doc.token_set
+    assert doc.text.startswith("code-buddy devcorp pair programmer")
+
+
+def test_fuzzy_vocabulary_resolves_typos_once_per_keyword():
+    """Typo'd keywords resolve to every close vocabulary term."""
+    from intelligent_search import FuzzyVocabulary
+    vocabulary = FuzzyVocabulary()
+    for term in ["coding", "codebuddy", "writing", "auto", "voice"]:
+        vocabulary.add(term)
+
+    assert "coding" in vocabulary.lookup("codng")
+    assert "writing" in vocabulary.lookup("wrting")
+    # Terms contained in a longer keyword count as partial matches
+    assert "auto" in vocabulary.lookup("automaton")
+    assert vocabulary.lookup("spreadsheet") == set()
+    # Partial matches of a keyword inside a longer term, typos included
+    vocabulary.add("transcoding")
+    assert vocabulary.lookup("transcodng") == {"coding", "transcoding"}
+
+
+def test_typo_keywords_score_by_vocabulary_membership(agents):
+    """Indexed search scores fuzzy keyword hits like the per-agent fallback."""
+    search = IntelligentSearch()
+    index = search.build_index(agents)
+    query = "progammer"
+    intent = search.extract_intent(query)
+    fuzzy_terms = index.resolve_keywords(intent['keywords'])
+
+    assert "programmer" in fuzzy_terms["progammer"]
+    for agent in agents:
+        assert search.calculate_relevance_score(agent, query, intent, fuzzy_terms) == \
+            search.calculate_relevance_score(agent, query, intent)
+
+
+def test_keyword_automaton_reports_overlapping_substrings():
+    """The automaton finds every pattern, like individual substring tests."""
+    from intelligent_search import KeywordAutomaton
+    automaton = KeywordAutomaton({'mail': ['email'], 'ai': ['ai'], 'email': ['email'], 'web': ['web']})
+
+    assert automaton.find("my email") == {'email', 'ai'}
+    assert automaton.find("webmail") == {'web', 'email', 'ai'}
+    assert automaton.find("nothing here") == set()
+
+
+def test_extract_intent_is_memoized_per_normalized_query():
+    """Intent is computed once per normalized query and returned as a copy."""
+    search = IntelligentSearch()
+    intent = search.extract_intent("Open Source coding chatbot")
+
+    assert intent['categories'] == ['chatbot', 'coding']
+    assert intent['platforms'] == ['open_source']
+    assert intent['use_cases'] == ['communication', 'development']
+    assert intent['keywords'] == ['open', 'source', 'coding', 'chatbot']
+
+    intent['categories'].append('mutated')
+    assert search.extract_intent("  open source CODING chatbot ")['categories'] == ['chatbot', 'coding']
+    assert list(search._intent_cache) == ["open source coding chatbot"]
+
+
+@pytest.mark.parametrize("query", ["coding", "support", "assistant", "ai", "writing blog"])
+@pytest.mark.parametrize("limit,offset", [(1, 0), (2, 0), (2, 1), (10, 0)])
+def test_top_k_search_matches_full_ranking_page(agents, query, limit, offset):
+    """A limited search returns exactly the matching page of the full ranking."""
+    search = IntelligentSearch()
+    search.build_index(agents)
+
+    full = search.search(agents, query)
+    assert search.search(agents, query, limit=limit, offset=offset) == full[offset:offset + limit]
+
+
+def test_top_k_search_skips_agents_that_cannot_rank(agents):
+    """Agents whose upper bound is below the k-th best score are not fuzzy-scored."""
+    search = IntelligentSearch()
+    search.build_index(agents)
+    scored = []
+    original = search._fuzzy_field_score
+
+    def counting_score(doc, query_lower):
+        scored.append(doc.name)
+        return original(doc, query_lower)
+
+    search._fuzzy_field_score = counting_score
+    results = search.search(agents, "ai", limit=1)
+
+    assert len(results) == 1
+    assert len(scored) < len(agents)
+
+
+def test_top_k_search_keeps_fuzzy_only_high_scorers(agents):
+    """An agent sharing no term with the query still ranks on its fuzzy fields."""
+    todoist = make_agent("Todoist", domains="Productivity", use_cases="Task lists",
+                         short_desc="Keeps track of tasks", creator="Doist")
+    agents.append(todoist)
+    search = IntelligentSearch()
+    index = search.build_index(agents)
+
+    intent = search.extract_intent("to do")
+    assert todoist not in index.candidates("to do", intent, index.resolve_keywords(intent['keywords']))
+    full = search.search(agents, "to do")
+    assert full[0] is todoist
+    assert search.search(agents, "to do", limit=3) == full[:3]
+
+
+def test_agents_are_slotted_and_share_repeated_values():
+    """Agents carry no per-instance __dict__ and intern low-cardinality values."""
+    first = make_agent("CodeBuddy", domains="Coding; Developer Tools", creator="".join(["Dev", "Corp"]))
+    second = make_agent("CodeHelper", domains="".join(["Coding; ", "Developer Tools"]), creator="DevCorp")
+
+    assert not hasattr(first, '__dict__')
+    assert first.creator is second.creator
+    assert first.domain_list[1] is second.domain_list[1]
+    assert first.search_doc.tokens[-1] is second.search_doc.tokens[-1]
+    with pytest.raises(AttributeError):
+        first.unexpected = True
@@ -0,0 +1,23 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from process_memory import read_process_memory
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'), reason="needs Linux smaps_rollup")
+def test_unique_memory_is_the_private_part_of_rss():
+    """USS is private clean + private dirty and never exceeds RSS."""
+    memory = read_process_memory()
+
+    assert memory['pid'] == os.getpid()
+    assert memory['uss_kb'] == memory['private_clean_kb'] + memory['private_dirty_kb']
+    assert 0 < memory['uss_kb'] <= memory['rss_kb']
+
+
+def test_missing_process_reports_nothing():
+    """Unknown processes (or platforms without /proc) yield an empty report."""
+    assert read_process_memory(2 ** 31 - 1) == {}
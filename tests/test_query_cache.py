@@ -0,0 +1,56 @@
+import pytest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_cache import QueryCache
+
+
+def test_make_key_normalizes_query_and_filters():
+    """Keys ignore query case/padding and filter order, but keep filter values."""
+    key = QueryCache.make_key("  Coding ", {'platform': 'Web', 'domain': 'Coding', 'model': None})
+    assert key == QueryCache.make_key("coding", {'domain': 'Coding', 'platform': 'Web'})
+    assert key != QueryCache.make_key("coding", {'domain': 'coding', 'platform': 'Web'})
+
+
+def test_lru_eviction_and_counters():
+    """The least recently used entry is evicted once the cache is full."""
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    cache.put('a', ('x',))
+    cache.put('b', ('y',))
+    assert cache.get('a') == ('x',)  # 'a' is now most recent
+    cache.put('c', ('z',))
+
+    assert cache.get('b') is None
+    assert cache.get('c') == ('z',)
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['evictions'] == 1
+    assert stats['size'] == 2
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    """Entries older than the TTL are treated as misses and dropped."""
+    now = [1000.0]
+    monkeypatch.setattr('query_cache.time.monotonic', lambda: now[0])
+    cache = QueryCache(max_entries=4, ttl_seconds=10)
+    cache.put('coding', ('codebuddy',))
+
+    now[0] += 5
+    assert cache.get('coding') == ('codebuddy',)
+    now[0] += 11
+    assert cache.get('coding') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_invalidate_clears_entries():
+    """Invalidation drops every entry and is counted."""
+    cache = QueryCache()
+    cache.put('coding', ('codebuddy',))
+    cache.invalidate()
+
+    assert cache.get('coding') is None
+    assert cache.stats()['invalidations'] == 1
@@ -0,0 +1,201 @@
+import pytest
+import sys
+import os
+import json
+import threading
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rating_system import RatingSystem
+
+
+@pytest.fixture
+def ratings_file(tmp_path):
+    return str(tmp_path / "ratings.json")
+
+
+def log_lines(ratings_file):
+    with open(ratings_file.replace('.json', '.jsonl')) as f:
+        return f.read().splitlines()
+
+
+def test_ratings_are_appended_one_line_each(ratings_file):
+    """Adding a rating appends a single JSON line and updates the aggregates."""
+    ratings = RatingSystem(ratings_file)
+    assert ratings.add_rating("codebuddy", 5, "Great")
+    assert ratings.add_rating("codebuddy", 4.5)
+    assert not ratings.add_rating("codebuddy", 6)
+
+    lines = log_lines(ratings_file)
+    assert len(lines) == 2
+    assert json.loads(lines[0])['feedback'] == "Great"
+
+    aggregate = ratings.aggregates["codebuddy"]
+    assert (aggregate.count, aggregate.total) == (2, 9.5)
+    assert aggregate.histogram == {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}
+    assert ratings.get_agent_ratings("codebuddy")['average_rating'] == 4.8
+
+
+def test_log_is_replayed_on_startup(ratings_file):
+    """A new instance rebuilds the same aggregates from the log."""
+    first = RatingSystem(ratings_file)
+    first.add_rating("codebuddy", 3)
+    first.add_rating("writewell", 5, "Nice")
+    first.log.close()
+
+    second = RatingSystem(ratings_file)
+    assert second.get_agent_ratings("writewell")['total_ratings'] == 1
+    assert second.get_agent_ratings("codebuddy")['ratings_breakdown'][3] == 1
+
+
+def test_torn_last_line_is_skipped_and_compacted_away(ratings_file):
+    """A partial line left by a crash does not break loading."""
+    ratings = RatingSystem(ratings_file)
+    ratings.add_rating("codebuddy", 4)
+    ratings.log.close()
+    with open(ratings_file.replace('.json', '.jsonl'), 'a') as f:
+        f.write('{"agent_slug": "codebuddy", "rat')
+
+    reloaded = RatingSystem(ratings_file)
+    assert reloaded.aggregates["codebuddy"].count == 1
+    assert len(log_lines(ratings_file)) == 1
+
+
+def test_legacy_json_ratings_are_imported_once(ratings_file):
+    """The old ratings.json array seeds the log when no log exists yet."""
+    with open(ratings_file, 'w') as f:
+        json.dump([{'agent_slug': 'chatgpt', 'rating': 5, 'feedback': '', 'timestamp': '2025-01-01T00:00:00',
+                    'user_identifier': 'anonymous'}], f)
+
+    ratings = RatingSystem(ratings_file)
+    ratings.add_rating("chatgpt", 3)
+
+    assert ratings.get_agent_ratings("chatgpt")['total_ratings'] == 2
+    assert len(log_lines(ratings_file)) == 2
+
+
+def test_recent_reviews_keep_the_newest_five_with_feedback(ratings_file):
+    """Only reviews with feedback are kept, newest first, ties in insertion order."""
+    ratings = RatingSystem(ratings_file)
+    entries = [
+        ("2025-01-03", "third"), ("2025-01-01", "first"), ("2025-01-05", "fifth"),
+        ("2025-01-04", "fourth a"), ("2025-01-04", "fourth b"), ("2025-01-02", "second"),
+        ("2025-01-06", ""),
+    ]
+    for timestamp, feedback in entries:
+        ratings._index_rating({'agent_slug': 'codebuddy', 'rating': 4, 'feedback': feedback,
+                               'timestamp': timestamp, 'user_identifier': 'anonymous'})
+
+    reviews = ratings.get_agent_ratings("codebuddy")['recent_reviews']
+    assert [r['feedback'] for r in reviews] == ["fifth", "fourth a", "fourth b", "third", "second"]
+    assert ratings.get_agent_ratings("codebuddy")['total_ratings'] == 7
+
+
+def test_leaderboard_stays_sorted_as_ratings_arrive(ratings_file):
+    """The maintained leaderboard matches one built from scratch."""
+    ratings = RatingSystem(ratings_file)
+    for slug, value in [("a", 5), ("a", 5), ("b", 4), ("b", 5), ("c", 3), ("c", 3)]:
+        ratings.add_rating(slug, value)
+    assert [e['agent_slug'] for e in ratings.get_top_rated_agents(min_ratings=2)] == ["a", "b", "c"]
+
+    for value in [1, 1, 1]:
+        ratings.add_rating("a", value)
+    ratings.add_rating("d", 5)
+
+    maintained = ratings.get_top_rated_agents(min_ratings=2)
+    rebuilt = RatingSystem(ratings_file).get_top_rated_agents(min_ratings=2)
+    assert [e['agent_slug'] for e in maintained] == ["b", "c", "a"]
+    assert maintained == rebuilt
+
+
+def test_bayesian_leaderboard_favours_volume_over_a_few_perfect_scores(ratings_file):
+    """A single 5-star rating does not beat a long run of 4.5s."""
+    ratings = RatingSystem(ratings_file)
+    ratings.add_rating("newcomer", 5)
+    for value in [4, 5] * 10:
+        ratings.add_rating("veteran", value)
+
+    assert ratings.get_top_rated_agents(min_ratings=1)[0]['agent_slug'] == "newcomer"
+    top = ratings.get_top_rated_agents(min_ratings=1, bayesian=True)
+    assert top[0]['agent_slug'] == "veteran"
+    assert top[0]['bayesian_rating'] == round((5 * 3.0 + 90) / 25, 2)
+
+
+def test_recent_reviews_read_from_the_global_buffer(ratings_file):
+    """Recent feedback across agents is served newest first without a full sort."""
+    ratings = RatingSystem(ratings_file)
+    ratings.add_rating("a", 5, "first")
+    ratings.add_rating("b", 4)
+    ratings.add_rating("b", 3, "second")
+
+    assert [r['feedback'] for r in ratings.get_recent_reviews(5)] == ["second", "first"]
+    assert [r['feedback'] for r in ratings.get_recent_reviews(500)] == ["second", "first"]
+
+
+def test_workers_sharing_a_log_see_each_others_ratings(ratings_file):
+    """Two instances on one log (two gunicorn workers) neither lose nor miss ratings."""
+    worker_a = RatingSystem(ratings_file)
+    worker_b = RatingSystem(ratings_file)
+    worker_a.add_rating("codebuddy", 5, "From A")
+    worker_b.add_rating("codebuddy", 3)
+    worker_a.add_rating("writewell", 4)
+
+    for worker in (worker_a, worker_b):
+        assert worker.get_agent_ratings("codebuddy")['total_ratings'] == 2
+        assert worker.get_top_rated_agents(min_ratings=1)[0]['agent_slug'] == "codebuddy"
+        assert [r['feedback'] for r in worker.get_recent_reviews()] == ["From A"]
+    assert len(log_lines(ratings_file)) == 3
+
+
+def test_compaction_by_another_worker_is_picked_up(ratings_file):
+    """After one instance rewrites the log, the other re-reads it and keeps appending."""
+    worker_a = RatingSystem(ratings_file)
+    worker_b = RatingSystem(ratings_file)
+    worker_a.add_rating("codebuddy", 4)
+    worker_b.get_top_rated_agents(min_ratings=1)
+
+    worker_b.add_rating("codebuddy", 2)
+    worker_a.compact()
+    worker_b.add_rating("codebuddy", 3)
+
+    assert worker_b.get_agent_ratings("codebuddy")['total_ratings'] == 3
+    assert worker_a.get_top_rated_agents(min_ratings=1) == worker_b.get_top_rated_agents(min_ratings=1)
+    assert len(log_lines(ratings_file)) == 3
+
+
+def test_torn_line_from_a_crashed_worker_is_compacted_by_the_next_rating(ratings_file):
+    """A running worker drops another worker's torn line the next time it rates."""
+    ratings = RatingSystem(ratings_file)
+    ratings.add_rating("codebuddy", 4)
+    with open(ratings_file.replace('.json', '.jsonl'), 'a') as f:
+        f.write('{"agent_slug": "codebuddy", "rat')
+
+    ratings.add_rating("codebuddy", 2)
+
+    assert ratings.log.invalid_lines == 0
+    assert [json.loads(line)['rating'] for line in log_lines(ratings_file)] == [4, 2]
+    assert ratings.aggregates["codebuddy"].count == 2
+
+
+def test_compaction_runs_alongside_ratings_without_deadlock(ratings_file):
+    """compact() and add_rating() from different threads take the log locks in the same order."""
+    ratings = RatingSystem(ratings_file)
+
+    def rate():
+        for _ in range(50):
+            ratings.add_rating("codebuddy", 4)
+
+    def compact():
+        for _ in range(50):
+            ratings.compact()
+
+    threads = [threading.Thread(target=rate, daemon=True), threading.Thread(target=compact, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not any(thread.is_alive() for thread in threads)
+
+    assert ratings.aggregates["codebuddy"].count == 50
+    assert len(log_lines(ratings_file)) == 50
@@ -0,0 +1,35 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slug_index import SlugIndex
+
+
+def item(slug, name):
+    return SimpleNamespace(slug=slug, name=name)
+
+
+def test_first_object_wins_and_duplicates_are_reported(caplog):
+    """Like the old linear scan, the first object with a slug is returned."""
+    first, second, third = item("chat-bot", "Chat Bot"), item("chat-bot", "Chat-Bot"), item("chat-bot", "chat bot")
+    index = SlugIndex('agent', [first, item("other", "Other"), second])
+    index.add(third)
+
+    assert index.get("chat-bot") is first
+    assert index.get("missing") is None
+    assert index.duplicates == {"chat-bot": 3}
+    assert "Duplicate agent slug 'chat-bot'" in caplog.text
+
+
+def test_rebuild_replaces_the_map():
+    """Rebuilding drops slugs and duplicates of the previous items."""
+    index = SlugIndex('recipe', [item("a", "A"), item("a", "A again")])
+    index.rebuild([item("b", "B")])
+
+    assert "a" not in index
+    assert len(index) == 1
+    assert index.duplicates == {}